@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import dataclasses
+import json
+import math
+import multiprocessing
+import platform
+import resource
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List
+
+import aiohttp
+
+from app.benchmarks.stand_in_server import StandInConfig, run_stand_in
+from app.parsers.main import get_rabota_ua_top_5_cvs, get_work_ua_top_5_cvs
+from app.parsers.site_configs.work_ua import (
+    WORK_UA_BASE_URL,
+    WORK_UA_CONFIG,
+    work_ua_url_generator,
+)
+
+POSITION = "python"
+LOCATION = "Київ"
+EXPERIENCE = "Від 2 до 5 років"
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Nearest-rank p50/p95/p99 of the values, in milliseconds."""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(values)
+
+    def rank(percent: int) -> float:
+        index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+        return round(ordered[index] * 1000, 2)
+
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99)}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+async def wait_until_ready(base_url: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(f"{base_url}/__stats"):
+                    return
+            except aiohttp.ClientError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+
+async def control(base_url: str, action: str) -> dict:
+    async with aiohttp.ClientSession() as session:
+        method = session.post if action == "__reset" else session.get
+        async with method(f"{base_url}/{action}") as response:
+            return await response.json()
+
+
+def work_ua_query(base_url: str) -> Callable[[], Awaitable]:
+    config = dataclasses.replace(WORK_UA_CONFIG, base_url=base_url)
+
+    def url_generator(**kwargs) -> str:
+        return work_ua_url_generator(**kwargs).replace(
+            WORK_UA_BASE_URL, base_url
+        )
+
+    return lambda: get_work_ua_top_5_cvs(
+        position=POSITION,
+        location=LOCATION,
+        experience=EXPERIENCE,
+        url_generator=url_generator,
+        config=config,
+    )
+
+
+def rabota_ua_query(base_url: str) -> Callable[[], Awaitable]:
+    return lambda: get_rabota_ua_top_5_cvs(
+        POSITION,
+        LOCATION,
+        EXPERIENCE,
+        base_api_url=f"{base_url}/",
+    )
+
+
+async def run_site(
+    name: str,
+    query: Callable[[], Awaitable],
+    base_url: str,
+    iterations: int,
+    concurrency: int,
+) -> dict:
+    """Runs `iterations` rounds of `concurrency` simultaneous queries
+    and collects client and stand-in measurements."""
+    await control(base_url, "__reset")
+    query_latencies = []
+    results_found = 0
+
+    async def timed_query() -> None:
+        nonlocal results_found
+        started_at = time.perf_counter()
+        result = await query()
+        query_latencies.append(time.perf_counter() - started_at)
+        results_found += len(result or [])
+
+    cpu_started_at = time.process_time()
+    wall_started_at = time.perf_counter()
+    for _ in range(iterations):
+        await asyncio.gather(*(timed_query() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - wall_started_at
+    cpu_time = time.process_time() - cpu_started_at
+
+    stats = await control(base_url, "__stats")
+    requests = len(stats["request_latencies"])
+    return {
+        "site": name,
+        "queries": len(query_latencies),
+        "results_found": results_found,
+        "wall_time_s": round(wall_time, 3),
+        "requests": requests,
+        "requests_per_sec": round(requests / wall_time, 2),
+        "request_latency_ms": percentiles(stats["request_latencies"]),
+        "query_latency_ms": percentiles(query_latencies),
+        "status_counts": stats["status_counts"],
+        "cpu_time_s": round(cpu_time, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    stand_in_config = StandInConfig(
+        pages=args.pages,
+        cards_per_page=args.cards_per_page,
+        rabota_total=args.rabota_total,
+        min_latency=args.min_latency,
+        max_latency=args.max_latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    # The stand-in runs in its own process so that CPU time and RSS
+    # only measure the scraper
+    server = multiprocessing.Process(
+        target=run_stand_in,
+        args=(stand_in_config, "127.0.0.1", args.port),
+        daemon=True,
+    )
+    server.start()
+    try:
+        await wait_until_ready(base_url)
+        queries = {
+            "work.ua": work_ua_query(base_url),
+            "rabota.ua": rabota_ua_query(base_url),
+        }
+        results = [
+            await run_site(
+                site,
+                queries[site],
+                base_url,
+                args.iterations,
+                args.concurrency,
+            )
+            for site in args.sites
+        ]
+    finally:
+        server.terminate()
+        server.join()
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "stand_in": dataclasses.asdict(stand_in_config),
+        "iterations": args.iterations,
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Offline benchmark of the work.ua and rabota.ua scrapers."
+    )
+    parser.add_argument(
+        "--sites", nargs="+", default=["work.ua", "rabota.ua"],
+        choices=["work.ua", "rabota.ua"],
+    )
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument(
+        "--concurrency", type=int, default=1,
+        help="Queries started at the same time in every iteration.",
+    )
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--cards-per-page", type=int, default=14)
+    parser.add_argument("--rabota-total", type=int, default=40)
+    parser.add_argument("--min-latency", type=float, default=0.02)
+    parser.add_argument("--max-latency", type=float, default=0.08)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--output", default="benchmark-results.json")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    report = asyncio.run(run_benchmark(args))
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
+    for result in report["results"]:
+        print(
+            f"{result['site']}: {result['requests_per_sec']} req/s, "
+            f"query p50 {result['query_latency_ms']['p50']} ms, "
+            f"p95 {result['query_latency_ms']['p95']} ms, "
+            f"CPU {result['cpu_time_s']} s, "
+            f"peak RSS {result['peak_rss_mb']} MB"
+        )
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
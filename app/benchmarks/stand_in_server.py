@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from string import Template
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+SKILLS = [
+    "Python", "Django", "FastAPI", "PostgreSQL", "Docker", "Git", "Linux",
+    "Redis", "Celery", "AWS", "REST API", "SQL", "asyncio", "Kubernetes",
+]
+NAMES = ["Олександр", "Марія", "Андрій", "Олена", "Дмитро", "Ірина"]
+
+
+@dataclass
+class StandInConfig:
+    # work.ua result pages and CV cards on each of them
+    pages: int = 10
+    cards_per_page: int = 14
+    # rabota.ua resumes in the search result
+    rabota_total: int = 40
+    # Latency added to every response, seconds (uniform in min..max)
+    min_latency: float = 0.02
+    max_latency: float = 0.08
+    # Share of requests answered with 503 / 429
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    seed: int = 19
+
+
+def load_fixture(name: str, fixtures_dir: str = FIXTURES_DIR) -> str:
+    with open(os.path.join(fixtures_dir, name), encoding="utf-8") as file:
+        return file.read()
+
+
+class StandIn:
+    def __init__(
+        self, config: StandInConfig, fixtures_dir: str = FIXTURES_DIR
+    ) -> None:
+        """Replays work.ua listing/detail HTML and rabota.ua JSON from
+        fixtures. Pages are filled deterministically from the resume id,
+        so every run sees the same candidates."""
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.listing = Template(
+            load_fixture("work_ua_listing.html", fixtures_dir)
+        )
+        self.card = Template(
+            load_fixture("work_ua_listing_card.html", fixtures_dir)
+        )
+        self.resume = Template(
+            load_fixture("work_ua_resume.html", fixtures_dir)
+        )
+        self.city_list = load_fixture("rabota_ua_citylist.json", fixtures_dir)
+        self.rabota_resume = json.loads(
+            load_fixture("rabota_ua_resume.json", fixtures_dir)
+        )
+        self.request_latencies = []
+        self.status_counts = {}
+
+    @staticmethod
+    def candidate(resume_id: int) -> dict:
+        rng = random.Random(resume_id)
+        return {
+            "name": f"{rng.choice(NAMES)} {resume_id}",
+            "age": rng.randint(19, 60),
+            "skills": rng.sample(SKILLS, rng.randint(0, 10)),
+            "salary": rng.randrange(15000, 120000, 5000),
+            "photo": rng.random() < 0.4,
+            "education": rng.random() < 0.7,
+            "languages": rng.random() < 0.5,
+            "additional_info": rng.random() < 0.3,
+        }
+
+    def render_listing(self, page: int, position: str) -> str:
+        first_id = (page - 1) * self.config.cards_per_page + 1
+        cards = []
+        last_id = first_id + self.config.cards_per_page
+        for resume_id in range(first_id, last_id):
+            candidate = self.candidate(resume_id)
+            cards.append(
+                self.card.substitute(
+                    resume_id=resume_id,
+                    position=position,
+                    date="1 серпня",
+                    name=candidate["name"],
+                    age=candidate["age"],
+                    photo=(
+                        f'<img src="/photo/{resume_id}.jpg" alt="">'
+                        if candidate["photo"] else ""
+                    ),
+                )
+            )
+        pages = "\n".join(
+            f'          <li><a href="?page={number}">{number}</a></li>'
+            for number in range(1, self.config.pages + 1)
+        )
+        return self.listing.substitute(
+            position=position, cards="\n".join(cards), pages=pages
+        )
+
+    def render_resume(self, resume_id: int) -> str:
+        candidate = self.candidate(resume_id)
+        skills = "\n".join(
+            f'      <li><span class="ellipsis">{skill}</span></li>'
+            for skill in candidate["skills"]
+        )
+        return self.resume.substitute(
+            position="Python developer",
+            name=candidate["name"],
+            age=candidate["age"],
+            salary=candidate["salary"],
+            skills=skills,
+            education=(
+                "    <h2 class=\"mt-lg\">Освіта</h2>\n"
+                "    <p>Київський політехнічний інститут</p>"
+                if candidate["education"] else ""
+            ),
+            languages=(
+                "    <h2 class=\"mt-lg\">Знання мов</h2>\n"
+                "    <p>Англійська — середній</p>"
+                if candidate["languages"] else ""
+            ),
+            additional_info=(
+                "    <h2 class=\"mt-lg\">Додаткова інформація</h2>\n"
+                "    <p>Відкритий до нових проєктів.</p>"
+                if candidate["additional_info"] else ""
+            ),
+        )
+
+    def render_rabota_resumes(self, page: int, page_size: int = 20) -> dict:
+        documents = []
+        first_id = page * page_size + 1
+        last_id = min(first_id + page_size, self.config.rabota_total + 1)
+        for resume_id in range(first_id, last_id):
+            candidate = self.candidate(resume_id)
+            document = copy.deepcopy(self.rabota_resume)
+            document.update(
+                resumeId=resume_id,
+                fullName=candidate["name"],
+                age=f"{candidate['age']} років",
+                salary=str(candidate["salary"]),
+                skills=candidate["skills"],
+                education=candidate["education"],
+                languages_exist=candidate["languages"],
+                photo=(
+                    f"https://img.rabota.ua/photo/{resume_id}.jpg"
+                    if candidate["photo"] else "None"
+                ),
+                url=f"https://rabota.ua/cv/{resume_id}",
+            )
+            documents.append(document)
+        return {"total": self.config.rabota_total, "documents": documents}
+
+    @web.middleware
+    async def conditions(self, request: web.Request, handler) -> web.Response:
+        """Adds latency and injected errors, and records request stats."""
+        if request.path.startswith("/__"):
+            return await handler(request)
+        started_at = time.perf_counter()
+        await asyncio.sleep(
+            self.random.uniform(
+                self.config.min_latency, self.config.max_latency
+            )
+        )
+        roll = self.random.random()
+        if roll < self.config.error_rate:
+            response = web.Response(status=503)
+        elif roll < self.config.error_rate + self.config.throttle_rate:
+            response = web.Response(status=429, headers={"Retry-After": "1"})
+        else:
+            response = await handler(request)
+        self.request_latencies.append(time.perf_counter() - started_at)
+        self.status_counts[response.status] = (
+            self.status_counts.get(response.status, 0) + 1
+        )
+        return response
+
+    async def work_ua_listing(self, request: web.Request) -> web.Response:
+        page = int(request.query.get("page", 1))
+        if page > self.config.pages:
+            raise web.HTTPNotFound()
+        position = request.match_info["query"].split("+")[0].strip("/")
+        return web.Response(
+            text=self.render_listing(page, position), content_type="text/html"
+        )
+
+    async def work_ua_resume(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.render_resume(int(request.match_info["resume_id"])),
+            content_type="text/html",
+        )
+
+    async def rabota_ua_city_list(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.city_list, content_type="application/json"
+        )
+
+    async def rabota_ua_resumes(self, request: web.Request) -> web.Response:
+        params = json.loads(await request.text() or "{}")
+        return web.json_response(
+            self.render_rabota_resumes(int(params.get("page", 0)))
+        )
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "request_latencies": self.request_latencies,
+                "status_counts": {
+                    str(status): count
+                    for status, count in self.status_counts.items()
+                },
+            }
+        )
+
+    async def reset(self, request: web.Request) -> web.Response:
+        self.request_latencies = []
+        self.status_counts = {}
+        return web.json_response({"config": asdict(self.config)})
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.conditions])
+        app.router.add_get(r"/resumes/{resume_id:\d+}/", self.work_ua_resume)
+        app.router.add_get(r"/resumes-{query:.*}", self.work_ua_listing)
+        app.router.add_get("/values/citylist", self.rabota_ua_city_list)
+        app.router.add_post("/cvdb/resumes", self.rabota_ua_resumes)
+        app.router.add_get("/__stats", self.stats)
+        app.router.add_post("/__reset", self.reset)
+        return app
+
+
+def run_stand_in(
+    config: StandInConfig, host: str = "127.0.0.1", port: int = 8089
+) -> None:
+    """Runs the stand-in server until interrupted."""
+    web.run_app(
+        StandIn(config).make_app(), host=host, port=port, print=None
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for work.ua and rabota.ua."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    for name, value in asdict(StandInConfig()).items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}", type=type(value), default=value
+        )
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    run_stand_in(StandInConfig(**args), host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_CITY_INDEX_DIR = os.getenv("CITY_INDEX_DIR", ".cache")
+DEFAULT_CITY_INDEX_TTL = 24 * 60 * 60
+# Seconds before a failed background refresh is tried again
+CITY_INDEX_RETRY_DELAY = 60
+# Suggestions offered for a city name that does not resolve
+CITY_SUGGESTIONS_LIMIT = 5
+# Fuzzy candidates (by shared trigrams) checked with edit distance
+FUZZY_CANDIDATES = 12
+# City list keys indexed, in priority order when names collide
+CITY_NAME_KEYS = ("nameUkr", "name", "en")
+
+APOSTROPHES_PATTERN = re.compile(r"[’ʼ`‘′´]")
+SEPARATORS_PATTERN = re.compile(r"[\s\-–—]+")
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_city_name(name: str) -> str:
+    """Normalises a city name for lookups: case, apostrophe variants,
+    'ё' and hyphens / repeated spaces do not matter."""
+    name = APOSTROPHES_PATTERN.sub("'", name.casefold())
+    name = name.replace("ё", "е")
+    return SEPARATORS_PATTERN.sub(" ", name).strip()
+
+
+def edit_distance(first: str, second: str) -> int:
+    """Levenshtein distance between two short strings."""
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (first_char != second_char),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def trigrams(name: str) -> List[str]:
+    padded = f"  {name} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class CitySuggester:
+    def __init__(
+        self, cities: List[dict], limit: int = CITY_SUGGESTIONS_LIMIT
+    ) -> None:
+        """Prefix trie and trigram index over every name of every city.
+        Each trie node keeps its best `limit` city ids, lowest id first
+        (rabota.ua numbers big cities first), so completing a prefix
+        is a walk down the trie. Names that match no prefix are
+        corrected by edit distance among the candidates sharing the
+        most trigrams with the query."""
+        self.limit = limit
+        self.root: dict = {}
+        self.names: Dict[str, int] = {}
+        self.trigram_names: Dict[str, List[str]] = {}
+        for key in CITY_NAME_KEYS:
+            for city in cities:
+                if city.get(key):
+                    self._add(normalize_city_name(city[key]), int(city["id"]))
+
+    def _add(self, name: str, city_id: int) -> None:
+        if name in self.names:
+            return
+        self.names[name] = city_id
+        node = self.root
+        for char in name:
+            node = node.setdefault(char, {})
+            best = node.setdefault(None, [])
+            if city_id not in best:
+                bisect.insort(best, city_id)
+                del best[self.limit:]
+        for trigram in set(trigrams(name)):
+            self.trigram_names.setdefault(trigram, []).append(name)
+
+    def complete(self, prefix: str) -> List[int]:
+        """Ids of the best cities with a name starting with `prefix`."""
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return list(node.get(None, []))
+
+    def correct(self, name: str) -> List[int]:
+        """Ids of cities whose name is a few typos away from `name`."""
+        shared = Counter(
+            candidate
+            for trigram in set(trigrams(name))
+            for candidate in self.trigram_names.get(trigram, ())
+        )
+        max_distance = max(1, len(name) // 3)
+        scored = []
+        for candidate, _ in shared.most_common(FUZZY_CANDIDATES):
+            distance = edit_distance(name, candidate)
+            if distance <= max_distance:
+                scored.append((distance, self.names[candidate]))
+        return [city_id for _, city_id in sorted(scored)]
+
+    def suggest(self, query: str) -> List[int]:
+        """Prefix completions first, then typo corrections."""
+        name = normalize_city_name(query)
+        if not name:
+            return []
+        city_ids = self.complete(name)
+        for city_id in self.correct(name):
+            if city_id not in city_ids:
+                city_ids.append(city_id)
+        return city_ids[:self.limit]
+
+
+class CityIndex:
+    def __init__(
+        self, path: str, ttl: float = DEFAULT_CITY_INDEX_TTL
+    ) -> None:
+        """Maps normalised Ukrainian, Russian and English city names
+        to city ids. The city list comes from `path` when it is there,
+        otherwise from the loader passed to the lookup, and is saved
+        back to `path`. Once it is older than `ttl` seconds, lookups
+        keep using it while it is reloaded in the background, so they
+        never wait on the API."""
+        self.path = path
+        self.ttl = ttl
+        self._ids: Dict[str, int] = {}
+        self._cities: List[dict] = []
+        self._names: Dict[int, str] = {}
+        self._suggester: Optional[CitySuggester] = None
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._retry_at = 0.0
+        # Keeps the async background refresh from being collected
+        self._refresh_task: Optional[asyncio.Task] = None
+        # The first download of the list, shared by concurrent lookups
+        self._cold_load: Optional[threading.Event] = None
+        self._cold_load_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def build(cities: List[dict]) -> Dict[str, int]:
+        ids = {}
+        for key in CITY_NAME_KEYS:
+            for city in cities:
+                if city.get(key):
+                    ids.setdefault(
+                        normalize_city_name(city[key]), int(city["id"])
+                    )
+        return ids
+
+    def _read_disk(self) -> Optional[Tuple[List[dict], float]]:
+        try:
+            with open(self.path, encoding="utf-8") as index_file:
+                stored = json.load(index_file)
+            return stored["cities"], stored["loaded_at"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, cities: List[dict], loaded_at: float) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as index_file:
+            json.dump(
+                {"loaded_at": loaded_at, "cities": cities},
+                index_file,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
+
+    def _set(self, cities: List[dict], loaded_at: float) -> None:
+        self._ids = self.build(cities)
+        self._cities = cities
+        self._names = {
+            int(city["id"]): next(
+                (city[key] for key in CITY_NAME_KEYS if city.get(key)), ""
+            )
+            for city in cities
+        }
+        self._suggester = None
+        self._loaded_at = loaded_at
+
+    def update(self, cities: List[dict]) -> None:
+        """Replaces the index with a freshly downloaded city list."""
+        cities = [
+            {key: city[key] for key in ("id", *CITY_NAME_KEYS) if key in city}
+            for city in cities
+        ]
+        loaded_at = time.time()
+        self._set(cities, loaded_at)
+        try:
+            self._write_disk(cities, loaded_at)
+        except OSError as e:
+            logger.warning("Could not save the city list: %s", e)
+
+    def _load_from_disk(self) -> bool:
+        with self._lock:
+            if self._loaded_at is None:
+                stored = self._read_disk()
+                if stored is not None:
+                    self._set(*stored)
+            return self._loaded_at is not None
+
+    def _start_refresh(self) -> bool:
+        """Claims the refresh if the index is stale and nobody else
+        is refreshing it."""
+        now = time.time()
+        if now - self._loaded_at <= self.ttl or now < self._retry_at:
+            return False
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            return True
+
+    def _finish_refresh(self, error: Optional[Exception]) -> None:
+        if error is not None:
+            self._retry_at = time.time() + CITY_INDEX_RETRY_DELAY
+            logger.warning("Could not refresh the city list: %s", error)
+        self._refreshing = False
+
+    def _load_cold(self, loader: Callable[[], List[dict]]) -> None:
+        """Downloads the city list when neither memory nor disk has it.
+        Concurrent callers wait for one download instead of each
+        running their own; the lock is not held while it runs."""
+        while True:
+            with self._lock:
+                if self._loaded_at is not None:
+                    return
+                loading = self._cold_load
+                if loading is None:
+                    loading = self._cold_load = threading.Event()
+                    break
+            loading.wait()
+        try:
+            self.update(loader())
+        finally:
+            with self._lock:
+                self._cold_load = None
+            loading.set()
+
+    async def _load_cold_async(
+        self, loader: Callable[[], Awaitable[List[dict]]]
+    ) -> None:
+        """Same as `_load_cold` for an async `loader`: concurrent
+        callers on one loop await one download task."""
+        task = self._cold_load_task
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+
+            async def load() -> None:
+                self.update(await loader())
+
+            def forget(done: asyncio.Task) -> None:
+                if self._cold_load_task is done:
+                    self._cold_load_task = None
+
+            task = self._cold_load_task = asyncio.create_task(load())
+            task.add_done_callback(forget)
+        # A cancelled caller must not cancel the others' download
+        await asyncio.shield(task)
+
+    def lookup(
+        self, city_name: str, loader: Callable[[], List[dict]]
+    ) -> Optional[int]:
+        """Returns the id of a city by any of its names, or None.
+        `loader` downloads the city list; stale lists are reloaded
+        with it in a background thread."""
+        if not self._load_from_disk():
+            self._load_cold(loader)
+        if self._start_refresh():
+
+            def refresh() -> None:
+                error = None
+                try:
+                    self.update(loader())
+                except Exception as e:
+                    error = e
+                finally:
+                    self._finish_refresh(error)
+
+            threading.Thread(target=refresh, daemon=True).start()
+        return self._ids.get(normalize_city_name(city_name))
+
+    async def lookup_async(
+        self, city_name: str, loader: Callable[[], Awaitable[List[dict]]]
+    ) -> Optional[int]:
+        """Same as `lookup` for an async `loader`; stale lists are
+        reloaded in a background task."""
+        if not self._load_from_disk():
+            await self._load_cold_async(loader)
+        if self._start_refresh():
+
+            async def refresh() -> None:
+                error = None
+                try:
+                    self.update(await loader())
+                except Exception as e:
+                    error = e
+                finally:
+                    # Also on cancellation, or no refresh would run again
+                    self._finish_refresh(error)
+
+            self._refresh_task = asyncio.create_task(refresh())
+        return self._ids.get(normalize_city_name(city_name))
+
+    def city_name(self, city_id: int) -> Optional[str]:
+        """The Ukrainian name of a loaded city."""
+        return self._names.get(city_id)
+
+    def suggest(self, query: str) -> List[Tuple[int, str]]:
+        """(id, Ukrainian name) of the cities a user most likely meant
+        by `query`. The index must have been loaded by a lookup."""
+        if self._suggester is None:
+            self._suggester = CitySuggester(self._cities)
+        return [
+            (city_id, self.city_name(city_id))
+            for city_id in self._suggester.suggest(query)
+        ]
+
+
+_shared_indexes: Dict[str, CityIndex] = {}
+_shared_lock = threading.Lock()
+
+
+def city_index_path(url: str, directory: str = DEFAULT_CITY_INDEX_DIR) -> str:
+    """The file the city list at `url` is saved to."""
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(directory, f"cities-{key}.json")
+
+
+def shared_city_index(
+    url: str, directory: str = DEFAULT_CITY_INDEX_DIR
+) -> CityIndex:
+    """Returns the process-wide index of the city list at `url`."""
+    with _shared_lock:
+        city_index = _shared_indexes.get(url)
+        if city_index is None:
+            city_index = CityIndex(city_index_path(url, directory))
+            _shared_indexes[url] = city_index
+        return city_index
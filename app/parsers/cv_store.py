@@ -0,0 +1,84 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from typing import Optional
+
+from app.parsers.metrics import CACHE_REQUESTS
+from app.parsers.parse_utils import CV
+
+DEFAULT_CV_STORE_PATH = os.getenv("CV_STORE_PATH", ".cache/cvs.sqlite3")
+DEFAULT_CV_MAX_AGE = 7 * 24 * 60 * 60
+
+
+class CVStore:
+    def __init__(
+        self,
+        path: str = DEFAULT_CV_STORE_PATH,
+        max_age: float = DEFAULT_CV_MAX_AGE,
+    ) -> None:
+        """SQLite store of parsed CVs keyed by resume URL.
+        Each record keeps its parse time and the version of the parser
+        that produced it; records older than `max_age` seconds or from
+        another parser version are treated as missing."""
+        self.path = path
+        self.max_age = max_age
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=10, check_same_thread=False
+        )
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS cvs ("
+                "url TEXT PRIMARY KEY, "
+                "data TEXT NOT NULL, "
+                "parsed_at REAL NOT NULL, "
+                "parser_version TEXT NOT NULL)"
+            )
+
+    def get(self, url: str, parser_version: str) -> Optional[CV]:
+        """Returns the stored CV if it is fresh and was produced
+        by the given parser version."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data, parsed_at, parser_version FROM cvs "
+                "WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            CACHE_REQUESTS.inc(cache="cv_store", result="miss")
+            return None
+        data, parsed_at, stored_version = row
+        if stored_version != parser_version:
+            CACHE_REQUESTS.inc(cache="cv_store", result="outdated")
+            return None
+        if time.time() - parsed_at > self.max_age:
+            CACHE_REQUESTS.inc(cache="cv_store", result="expired")
+            return None
+        CACHE_REQUESTS.inc(cache="cv_store", result="hit")
+        return CV(**json.loads(data))
+
+    def put(self, cv: CV, parser_version: str) -> None:
+        """Stores a parsed CV, replacing any older record."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cvs "
+                "(url, data, parsed_at, parser_version) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    cv.url,
+                    json.dumps(asdict(cv), ensure_ascii=False),
+                    time.time(),
+                    parser_version,
+                ),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,158 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.parsers.parse_utils import SiteConfig
+from app.parsers.parser_backends import (
+    ParserBackend,
+    parse_contains_selector,
+)
+
+# CV field -> (selector key in SiteConfig.selectors, value kind)
+CV_FIELD_SPECS = {
+    "name": ("name", "text"),
+    "age": ("age", "age"),
+    "skills": ("skills", "texts"),
+    "location": ("location", "text"),
+    "salary": ("salary", "salary"),
+    "education": ("education", "exists"),
+    "additional_education_exists": ("additional_education", "exists"),
+    "additional_info": ("additional_info", "exists"),
+    "languages_exist": ("languages", "exists"),
+}
+
+
+def age_from_text(age_text: str) -> Optional[int]:
+    """Converts text like '33 роки' to an age."""
+    if age_text and age_text.split()[0].isdigit():
+        return int(age_text.split()[0])
+    return None
+
+
+def salary_from_text(salary_text: str) -> Optional[int]:
+    """Converts text like '30 000 грн' to a salary."""
+    if salary_text:
+        # Remove any non-digit characters
+        salary_digits = "".join(filter(str.isdigit, salary_text))
+        return int(salary_digits) if salary_digits else None
+    return None
+
+
+@dataclass
+class FieldRule:
+    field: str
+    kind: str
+    contains_text: Optional[str] = None
+    sibling: Optional[str] = None
+
+
+@dataclass
+class SelectorGroup:
+    css: str
+    rules: List[FieldRule] = field(default_factory=list)
+
+    @property
+    def needs_text_scan(self) -> bool:
+        return any(rule.contains_text is not None for rule in self.rules)
+
+
+class ExtractionPlan:
+    def __init__(self, groups: List[SelectorGroup]) -> None:
+        """A compiled set of CV field rules grouped by base CSS selector.
+        Each group is selected once per document and its nodes are
+        matched against all of the group's rules in the same pass."""
+        self.groups = groups
+
+    @classmethod
+    def compile(cls, selectors: Dict[str, str]) -> "ExtractionPlan":
+        """Compiles SiteConfig selectors into an extraction plan.
+        Fields sharing a base selector, such as the `h2` section
+        headings, end up in one group."""
+        groups: Dict[str, SelectorGroup] = {}
+        for field_name, (selector_key, kind) in CV_FIELD_SPECS.items():
+            selector = selectors[selector_key]
+            contains = parse_contains_selector(selector)
+            if contains is None:
+                css, rule = selector, FieldRule(field_name, kind)
+            else:
+                css = contains.base
+                rule = FieldRule(
+                    field_name, kind, contains.text, contains.sibling
+                )
+            groups.setdefault(css, SelectorGroup(css)).rules.append(rule)
+        return cls(list(groups.values()))
+
+    def extract(self, doc: Any, backend: ParserBackend) -> Dict[str, Any]:
+        """Fills every CV field from a parsed document."""
+        matches: Dict[str, List[Any]] = {}
+
+        for group in self.groups:
+            nodes = backend.css_select(doc, group.css)
+            if not group.needs_text_scan:
+                for rule in group.rules:
+                    matches[rule.field] = nodes
+                continue
+
+            pending = list(group.rules)
+            for node in nodes:
+                if not pending:
+                    break
+                node_text = backend.raw_text(node)
+                for rule in list(pending):
+                    matched = self._match(backend, node, node_text, rule)
+                    if matched is None:
+                        continue
+                    matches.setdefault(rule.field, []).append(matched)
+                    if rule.kind != "texts":
+                        pending.remove(rule)
+
+        return {
+            field_name: self._value(
+                backend, kind, matches.get(field_name, [])
+            )
+            for field_name, (_, kind) in CV_FIELD_SPECS.items()
+        }
+
+    @staticmethod
+    def _match(
+        backend: ParserBackend, node: Any, node_text: str, rule: FieldRule
+    ) -> Any:
+        """Returns the node a rule picks from `node`, or None."""
+        if rule.contains_text is None:
+            return node
+        if rule.contains_text not in node_text:
+            return None
+        if rule.sibling is None:
+            return node
+        sibling = backend.next_element_sibling(node)
+        if sibling is not None and backend.tag_name(sibling) == rule.sibling:
+            return sibling
+        return None
+
+    @staticmethod
+    def _value(backend: ParserBackend, kind: str, nodes: List[Any]) -> Any:
+        """Converts the matched nodes of a field to its CV value."""
+        if kind == "exists":
+            return bool(nodes)
+        if kind == "texts":
+            texts = (backend.text(node) for node in nodes)
+            return [text for text in texts if text]
+
+        text = backend.text(nodes[0]) if nodes else "Unknown"
+        if kind == "age":
+            return age_from_text(text)
+        if kind == "salary":
+            return salary_from_text(text)
+        return text
+
+
+@lru_cache(maxsize=None)
+def _compile_cached(selectors: Tuple[Tuple[str, str], ...]) -> ExtractionPlan:
+    return ExtractionPlan.compile(dict(selectors))
+
+
+def get_extraction_plan(config: SiteConfig) -> ExtractionPlan:
+    """Returns the compiled extraction plan for a site configuration.
+    Plans are compiled once per distinct set of selectors, also inside
+    parse worker processes."""
+    return _compile_cached(tuple(sorted(config.selectors.items())))
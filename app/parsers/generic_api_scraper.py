@@ -1,10 +1,71 @@
-from typing import List, Dict, Any
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Tuple
 from attr import dataclass
 import requests
-import json
+import asyncio
+import logging
+import math
 import re
+import time
 
+from app.parsers import json_codec
+from app.parsers.city_index import CityIndex, shared_city_index
+from app.parsers.http_engine import HttpEngine
+from app.parsers.metrics import (
+    ERRORS,
+    STAGE_SECONDS,
+    site_label,
+    track_request,
+)
+from app.parsers.pagination import PaginationBudget, PaginationPlanner
 from app.parsers.parse_utils import CV
+from app.parsers.rate_limiter import (
+    AdaptiveRateLimiter,
+    RetryPolicy,
+    default_rate_limiter,
+    send_with_retries_sync,
+)
+from app.parsers.top_k import DEFAULT_TOP_K, TopKSelector
+
+# The only resume fields create_cv_from_resume reads
+RESUME_FIELDS = (
+    "fullName",
+    "age",
+    "cityName",
+    "skills",
+    "education",
+    "additional_education_exists",
+    "languages_exist",
+    "photo",
+    "url",
+)
+AGE_PATTERN = re.compile(r"\d+")
+
+logger = logging.getLogger(__name__)
+
+
+def project_resume(resume: Dict) -> Dict:
+    """Keeps only the resume fields a CV is built from, so the rest of
+    a decoded search page can be freed."""
+    return {key: resume[key] for key in RESUME_FIELDS if key in resume}
+
+
+def project_resume_page(result: Any) -> Any:
+    """Projects the documents of a decoded search page in place."""
+    if isinstance(result, dict) and "documents" in result:
+        result["documents"] = [
+            project_resume(resume) for resume in result["documents"]
+        ]
+    return result
+
+
+def age_from_resume(age_str: str) -> Optional[int]:
+    match = AGE_PATTERN.search(age_str or "")
+    return int(match.group()) if match else None
+
+
+def photo_url_from_resume(photo_url: str) -> Optional[str]:
+    """Process photo URL and return None if the URL contains 'None'."""
+    return photo_url if photo_url and "None" not in photo_url else None
 
 
 @dataclass
@@ -14,19 +75,42 @@ class GenericApiScraper:
     city_list_endpoint: str
     headers: dict
     experience_categories: dict
+    rate_limiter: AdaptiveRateLimiter = None
+    retry_policy: RetryPolicy = None
+    city_index: CityIndex = None
 
-    def _fetch_data(self, url, params=None) -> Any:
-        if params:
-            response = requests.post(
-                url,
-                headers=self.headers,
-                data=json.dumps(params)
-            )
-        else:
-            response = requests.get(url, headers=self.headers)
+    @property
+    def site(self) -> str:
+        """Label of this API in metrics."""
+        return site_label(self.base_url)
+
+    def _send(self, url, params=None) -> requests.Response:
+        """Sends one request and records it in the HTTP metrics."""
+        with track_request(site_label(url)) as request:
+            if params:
+                response = requests.post(
+                    url,
+                    headers=self.headers,
+                    data=json_codec.dumps(params)
+                )
+            else:
+                response = requests.get(url, headers=self.headers)
+            request["status"] = response.status_code
+            return response
 
+    def _fetch_data(self, url, params=None) -> Any:
+        """Fetches JSON from the API, paced by the shared per-host rate
+        limiter and retried on network errors, 429 and 5xx."""
+        response = send_with_retries_sync(
+            lambda: self._send(url, params),
+            url,
+            self.rate_limiter or default_rate_limiter,
+            self.retry_policy or RetryPolicy(),
+            (requests.RequestException,),
+            lambda response: response.status_code,
+        )
         if response.status_code == 200:
-            return response.json()
+            return json_codec.loads(response.content)
         else:
             raise Exception(
                 f"Error fetching data: "
@@ -37,14 +121,19 @@ class GenericApiScraper:
         url = self.base_url + self.city_list_endpoint
         return self._fetch_data(url)
 
-    def get_city_id_by_name(self, city_name: str) -> int:
-        cities = self.get_city_list()
-        key = "nameUkr"
+    def _city_index(self) -> CityIndex:
+        return self.city_index or shared_city_index(
+            self.base_url + self.city_list_endpoint
+        )
 
-        for city in cities:
-            if city[key].lower() == city_name.lower():
-                return int(city["id"])
-        raise Exception(f"City '{city_name}' not found.")
+    def get_city_id_by_name(self, city_name: str) -> int:
+        """Resolves a city name through `city_index`, by default the
+        process-wide index of this API's city list, so the list is
+        not downloaded for every search."""
+        city_id = self._city_index().lookup(city_name, self.get_city_list)
+        if city_id is None:
+            raise Exception(f"City '{city_name}' not found.")
+        return city_id
 
     def get_resumes(
         self, position: str, city_name: str, experience_label=None
@@ -52,9 +141,25 @@ class GenericApiScraper:
         try:
             city_id = self.get_city_id_by_name(city_name)
         except Exception as e:
-            print(f"An error occurred while getting city ID: {e}")
+            ERRORS.inc(site=self.site, stage="city")
+            logger.warning("An error occurred while getting city ID: %s", e)
             return
 
+        url = self.base_url + self.resumes_endpoint
+        params = self.resume_search_params(position, city_id, experience_label)
+
+        with STAGE_SECONDS.time(site=self.site, stage="listing_fetch"):
+            return project_resume_page(self._fetch_data(url, params))
+
+    def resume_search_params(
+        self,
+        position: str,
+        city_id: int,
+        experience_label=None,
+        page: int = 0,
+    ) -> Dict[str, Any]:
+        """Builds the body of a resume search request
+        for a zero-based result page."""
         experience_ids = []
 
         if experience_label:
@@ -62,10 +167,8 @@ class GenericApiScraper:
                 self.experience_categories.get(experience_label, "0")
             )
 
-        url = self.base_url + self.resumes_endpoint
-
-        params = {
-            "page": 0,
+        return {
+            "page": page,
             "period": "ThreeMonths",
             "sort": "Score",
             "searchType": "skills",
@@ -76,23 +179,12 @@ class GenericApiScraper:
             "keyWords": position,
         }
 
-        return self._fetch_data(url, params)
-
-    @staticmethod
-    def create_cv_from_resume(resume: Dict) -> CV:
+    def create_cv_from_resume(self, resume: Dict) -> CV:
         """Convert a resume dictionary to a CV dataclass instance."""
-
-        def extract_age(age_str: str) -> int:
-            match = re.search(r"\d+", age_str)
-            return int(match.group()) if match else None
-
-        def process_photo_url(photo_url: str) -> str:
-            """Process photo URL and return None if the URL contains 'None'."""
-            return photo_url if photo_url and "None" not in photo_url else None
-
+        url = resume.get("url", "No URL").replace("/cv/", "/candidates/")
         return CV(
             name=resume.get("fullName", "Unknown"),
-            age=extract_age(resume.get("age", "")),
+            age=age_from_resume(resume.get("age", "")),
             location=resume.get("cityName", "Unknown"),
             skills=resume.get("skills", []),
             education=resume.get("education", False),
@@ -100,22 +192,187 @@ class GenericApiScraper:
                 "additional_education_exists", False
             ),
             languages_exist=resume.get("languages_exist", False),
-            photo=process_photo_url(resume.get("photo", "")),
-            url=(resume.get("url", "No URL")).replace("/cv/", "/candidates/"),
+            photo=photo_url_from_resume(resume.get("photo", "")),
+            url=url,
         )
 
+    def get_top_k_cv(
+        self, resumes: Iterable[Dict], k: int = DEFAULT_TOP_K
+    ) -> List[CV]:
+        """Rate resumes one by one and return the top K as CV objects.
+        Only K CVs are kept in memory at any time."""
+        selector = TopKSelector(k)
+        self.push_resumes(selector, resumes)
+        return selector.results()
+
+    def push_resumes(
+        self, selector: TopKSelector, resumes: Iterable[Dict]
+    ) -> None:
+        """Rates resumes and merges them into a running top K."""
+        for resume in resumes:
+            cv = self.create_cv_from_resume(resume)
+            with STAGE_SECONDS.time(site=self.site, stage="rating"):
+                cv.calculate_rating()
+                selector.push(cv)
+
     def get_top_5_cv(self, resumes: List[Dict]) -> List[CV]:
         """Rank resumes based on CV attributes and
         return the top 5 as CV objects."""
-        # Convert resumes to CV dataclass instances
-        cv_list = [self.create_cv_from_resume(resume) for resume in resumes]
+        return self.get_top_k_cv(resumes, k=5)
 
-        # Calculate ratings for each CV
-        for cv in cv_list:
-            cv.calculate_rating()
 
-        # Sort CVs by rating in descending order
-        ranked_cvs = sorted(cv_list, key=lambda x: x.rating, reverse=True)
+@dataclass
+class AsyncGenericApiScraper(GenericApiScraper):
+    """GenericApiScraper on top of the pooled aiohttp HttpEngine, so
+    requests reuse keep-alive connections and no thread is needed.
+    When `http_engine` is omitted the scraper owns a private engine
+    and closes it in `close()`."""
+
+    http_engine: HttpEngine = None
+
+    def __attrs_post_init__(self) -> None:
+        self._owns_engine = self.http_engine is None
+        if self._owns_engine:
+            self.http_engine = HttpEngine(
+                rate_limiter=self.rate_limiter,
+                retry_policy=self.retry_policy,
+            )
+
+    async def close(self) -> None:
+        """Closes the HTTP engine if the scraper created it."""
+        if self._owns_engine:
+            await self.http_engine.close()
+
+    async def __aenter__(self) -> "AsyncGenericApiScraper":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _fetch_data(self, url, params=None) -> Any:
+        """Fetches JSON from the API through the HTTP engine, which
+        paces and retries requests."""
+        if params:
+            result = await self.http_engine.fetch(
+                url,
+                method="POST",
+                headers=self.headers,
+                data=json_codec.dumps(params),
+            )
+        else:
+            result = await self.http_engine.fetch(url, headers=self.headers)
+
+        if result.status == 200:
+            return json_codec.loads(result.body)
+        else:
+            raise Exception(
+                f"Error fetching data: {result.status} - {result.text()}"
+            )
+
+    async def get_city_list(self) -> str:
+        url = self.base_url + self.city_list_endpoint
+        return await self._fetch_data(url)
+
+    async def get_city_id_by_name(self, city_name: str) -> int:
+        city_id = await self._city_index().lookup_async(
+            city_name, self.get_city_list
+        )
+        if city_id is None:
+            raise Exception(f"City '{city_name}' not found.")
+        return city_id
+
+    async def get_resumes(
+        self, position: str, city_name: str, experience_label=None
+    ) -> None | Any:
+        try:
+            city_id = await self.get_city_id_by_name(city_name)
+        except Exception as e:
+            ERRORS.inc(site=self.site, stage="city")
+            logger.warning("An error occurred while getting city ID: %s", e)
+            return
+
+        url = self.base_url + self.resumes_endpoint
+        params = self.resume_search_params(position, city_id, experience_label)
+
+        with STAGE_SECONDS.time(site=self.site, stage="listing_fetch"):
+            return project_resume_page(await self._fetch_data(url, params))
+
+    async def fetch_resume_page(
+        self, url: str, params: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], float]:
+        """Fetches one search result page and the time it took.
+        Only the resume fields a CV needs are kept."""
+        started_at = time.monotonic()
+        with STAGE_SECONDS.time(site=self.site, stage="listing_fetch"):
+            result = await self._fetch_data(url, params)
+        return project_resume_page(result), time.monotonic() - started_at
+
+    async def iter_resume_pages(
+        self,
+        position: str,
+        city_name: str,
+        experience_label=None,
+        budget: PaginationBudget = None,
+        planner: PaginationPlanner = None,
+    ) -> AsyncIterator[List[Dict]]:
+        """Yields the resumes of each search result page as it arrives.
+        The first page gives the total count; the planner then fetches
+        further pages in concurrent batches until `budget` is spent.
+        Resumes already seen on an earlier page are dropped."""
+        try:
+            city_id = await self.get_city_id_by_name(city_name)
+        except Exception as e:
+            ERRORS.inc(site=self.site, stage="city")
+            logger.warning("An error occurred while getting city ID: %s", e)
+            return
+
+        url = self.base_url + self.resumes_endpoint
+        planner = planner or PaginationPlanner(budget)
+        seen_urls = set()
+
+        def new_resumes(result: Dict[str, Any]) -> List[Dict]:
+            resumes = []
+            for resume in result.get("documents", []):
+                if resume.get("url") in seen_urls:
+                    continue
+                seen_urls.add(resume.get("url"))
+                resumes.append(resume)
+            return resumes
+
+        first_page, latency = await self.fetch_resume_page(
+            url, self.resume_search_params(position, city_id, experience_label)
+        )
+        resumes = new_resumes(first_page)
+        page_size = len(first_page.get("documents", []))
+        total = first_page.get("total", page_size)
+        planner.start(math.ceil(total / page_size) if page_size else 1)
+        planner.record(latency, len(resumes))
+        yield resumes
 
-        # Return the top 5 resumes
-        return ranked_cvs[: min(len(ranked_cvs), 5)]
+        # Planner pages are one-based, API pages zero-based
+        while pages := planner.next_batch():
+            tasks = [
+                asyncio.create_task(
+                    self.fetch_resume_page(
+                        url,
+                        self.resume_search_params(
+                            position, city_id, experience_label, page - 1
+                        ),
+                    )
+                )
+                for page in pages
+            ]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    try:
+                        result, latency = await task
+                    except Exception as e:
+                        ERRORS.inc(site=self.site, stage="fetch")
+                        logger.warning("Error fetching resumes: %s", e)
+                        continue
+                    resumes = new_resumes(result)
+                    planner.record(latency, len(resumes))
+                    yield resumes
+            finally:
+                for task in tasks:
+                    task.cancel()
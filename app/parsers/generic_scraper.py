@@ -1,11 +1,36 @@
-import os
 import asyncio
+import logging
+import time
 import aiohttp
+from concurrent.futures import Executor
 from bs4 import BeautifulSoup
 
-from typing import Callable, List, Optional, Any
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Any,
+)
 
+from app.parsers import html_parsing
+from app.parsers.cv_store import CVStore
+from app.parsers.http_cache import HttpCache
+from app.parsers.http_engine import HttpEngine
+from app.parsers.metrics import (
+    ERRORS,
+    PARSE_SECONDS,
+    STAGE_SECONDS,
+    site_label,
+)
+from app.parsers.pagination import PaginationBudget, PaginationPlanner
 from app.parsers.parse_utils import SiteConfig, CV
+from app.parsers.parser_backends import ParserBackend, get_parser_backend
+from app.parsers.top_k import DEFAULT_TOP_K, TopKSelector
+
+logger = logging.getLogger(__name__)
 
 
 class GenericScraper:
@@ -17,16 +42,51 @@ class GenericScraper:
         location: str = None,
         experience: str = None,
         url_generator=Callable,
+        http_engine: HttpEngine = None,
+        parse_executor: Executor = None,
+        http_cache: HttpCache = None,
+        cv_store: CVStore = None,
+        pagination_budget: PaginationBudget = None,
     ) -> None:
         """Initializes the scraper with site configuration,
         experience categories, position,
-        location, experience, and a URL generator."""
+        location, experience, and a URL generator.
+        All requests go through `http_engine`; when it is omitted
+        the scraper owns a private engine and closes it in `close()`.
+        HTML is parsed in `parse_executor` when one is given,
+        pages are read through `http_cache` when one is given and
+        parsed CVs are reused from `cv_store` when one is given.
+        `pagination_budget` caps how many listing pages are crawled."""
         self.config = config
         self.url_generator = url_generator
         self.experience_categories = experience_categories
         self.position = position
         self.location = location
         self.experience = experience
+        self._owns_engine = http_engine is None
+        self.http_engine = http_engine or HttpEngine()
+        self.parse_executor = parse_executor
+        self.http_cache = http_cache
+        self.cv_store = cv_store
+        self.pagination_budget = pagination_budget
+        # Label of this site in metrics
+        self.site = site_label(config.base_url)
+
+    def report_error(self, stage: str, message: str, *args: Any) -> None:
+        """Logs a handled error and counts it in the error metric."""
+        ERRORS.inc(site=self.site, stage=stage)
+        logger.warning(message, *args)
+
+    async def close(self) -> None:
+        """Closes the HTTP engine if the scraper created it."""
+        if self._owns_engine:
+            await self.http_engine.close()
+
+    async def __aenter__(self) -> "GenericScraper":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
 
     def create_url_from_query(self, page: int = 1) -> Callable:
         """Generates the URL for a specific query with pagination."""
@@ -38,110 +98,90 @@ class GenericScraper:
         )
         return url
 
-    @staticmethod
-    async def get_page_html(session, url: str) -> str:
+    async def get_page_html(self, url: str) -> str:
         """Asynchronously fetches the HTML content
         of a webpage given its URL."""
         try:
-            async with session.get(url) as response:
-                response.raise_for_status()
-                return await response.text()
-        except aiohttp.ClientError as e:
-            print(f"Error fetching {url}: {e}")
+            if self.http_cache is not None:
+                return await self.http_cache.fetch_text(self.http_engine, url)
+            return await self.http_engine.fetch_text(url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.report_error("fetch", "Error fetching %s: %s", url, e)
             return ""
 
+    async def run_parser(self, parse_func: Callable, html: str) -> Any:
+        """Runs a parse function from html_parsing on raw HTML.
+        With a parse executor the CPU-bound parsing happens off the
+        event loop; otherwise it runs inline."""
+        with PARSE_SECONDS.time(site=self.site, parser=parse_func.__name__):
+            if self.parse_executor is None:
+                return parse_func(html, self.config)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.parse_executor, parse_func, html, self.config
+            )
+
     async def extract_cv_urls(self, html: str) -> List[str]:
         """Extracts CV URLs from the HTML content of a page."""
-        base_url = self.config.base_url.replace("-", "")
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            cv_cards = soup.select(self.config.selectors["cv_card"])
-            return [f"{base_url}{card.find('a')['href']}" for card in cv_cards]
+            return await self.run_parser(html_parsing.parse_cv_urls, html)
         except Exception as e:
-            print(f"Error extracting CV URLs: {e}")
+            self.report_error("parse", "Error extracting CV URLs: %s", e)
             return []
 
-    async def get_total_pages(self, session, url: str) -> int:
+    async def get_total_pages(self, url: str) -> int:
         """Gets the total number of pages available for the query."""
-        html = await self.get_page_html(session, url)
+        html = await self.get_page_html(url)
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            pagination = soup.select_one(self.config.selectors["paginator"])
-            if pagination:
-                last_page_link = pagination.select("a")[-2]
-                return int(last_page_link.get_text())
+            return await self.run_parser(
+                html_parsing.parse_total_pages, html
+            )
         except Exception as e:
-            print(f"Error extracting total pages: {e}")
+            self.report_error(
+                "parse", "Error extracting total pages: %s", e
+            )
         return 1
 
-    async def process_page_range(self, page_range: range) -> List[str]:
-        """Processes a range of pages to extract all CV URLs from each page."""
-        async with aiohttp.ClientSession() as session:
-            urls = []
-            for page in page_range:
-                url = self.create_url_from_query(page=page)
-                html = await self.get_page_html(session, url)
-                page_urls = await self.extract_cv_urls(html)
-                urls.extend(page_urls)
-            return urls
-
     async def get_all_cv_urls(self) -> List[str]:
-        """Gets all CV URLs by processing all pages in the search results."""
-        async with aiohttp.ClientSession() as session:
-            first_page_url = self.create_url_from_query(page=1)
-            total_pages = await self.get_total_pages(session, first_page_url)
-
-        num_processes = min(os.cpu_count(), total_pages)
-        page_ranges = [
-            range(i, total_pages + 1, num_processes)
-            for i in range(1, num_processes + 1)
+        """Gets all CV URLs from the search results pages
+        allowed by the pagination budget."""
+        return [
+            url
+            async for urls in self.iter_listing_pages()
+            for url in urls
         ]
 
-        tasks = [
-            self.process_page_range(page_range) for page_range in page_ranges
-        ]
-        results = await asyncio.gather(*tasks)
-        return [url for result in results for url in result]
+    async def extract_cv_data(self, url: str) -> CV:
+        """Extracts detailed CV data from a given CV URL.
+        A fresh CV from the store skips both the fetch and the parse.
+        The SQLite store is read and written in a thread, off the
+        event loop."""
+        if self.cv_store is not None:
+            stored_cv = await asyncio.to_thread(
+                self.cv_store.get, url, html_parsing.PARSER_VERSION
+            )
+            if stored_cv is not None:
+                return stored_cv
 
-    async def extract_cv_data(self, session, url: str) -> CV:
-        """Extracts detailed CV data from a given CV URL."""
-        html = await self.get_page_html(session, url)
-        soup = BeautifulSoup(html, "html.parser")
+        with STAGE_SECONDS.time(site=self.site, stage="detail_fetch"):
+            html = await self.get_page_html(url)
 
         try:
-            name = self.extract_text(soup, self.config.selectors["name"])
-            age = self.extract_age(soup)
-            location = self.extract_text(
-                soup,
-                self.config.selectors["location"]
-            )
-            salary = self.extract_salary(soup)
-            skills = self.extract_skills(soup)
-
-            return CV(
-                name=name,
-                age=age,
-                skills=skills,
-                location=location,
-                salary=salary,
-                education=self.exists(
-                    soup,
-                    self.config.selectors["education"]
-                ),
-                additional_education_exists=self.exists(
-                    soup, self.config.selectors["additional_education"]
-                ),
-                additional_info=self.exists(
-                    soup, self.config.selectors["additional_info"]
-                ),
-                languages_exist=self.exists(
-                    soup,
-                    self.config.selectors["languages"]
-                ),
-                url=url,
+            fields = await self.run_parser(
+                html_parsing.parse_cv_fields, html
             )
+            cv = CV(**fields, url=url)
+            # A page without a name is not a CV, e.g. an anti-bot page;
+            # storing it would serve an empty CV for days
+            if self.cv_store is not None and cv.name != "Unknown":
+                await asyncio.to_thread(
+                    self.cv_store.put, cv, html_parsing.PARSER_VERSION
+                )
+            return cv
         except Exception as e:
-            print(f"Error extracting CV data from {url}: {e}")
+            self.report_error(
+                "parse", "Error extracting CV data from %s: %s", url, e
+            )
             return CV(
                 name="Unknown",
                 age=None,
@@ -158,45 +198,156 @@ class GenericScraper:
     @staticmethod
     def extract_text(soup: BeautifulSoup, selector: str) -> str:
         """Extracts text content from a given selector."""
-        tag = soup.select_one(selector)
-        return tag.get_text(strip=True) if tag else "Unknown"
+        return html_parsing.extract_text(soup, selector)
+
+    @property
+    def parser_backend(self) -> ParserBackend:
+        """The parser backend selected by the site configuration."""
+        return get_parser_backend(self.config.parser_backend)
 
-    def extract_age(self, soup: BeautifulSoup) -> Optional[int]:
+    def extract_age(self, soup: Any) -> Optional[int]:
         """Extracts the age from the CV if available."""
-        age_text = self.extract_text(soup, self.config.selectors["age"])
-        if age_text and age_text.split()[0].isdigit():
-            return int(age_text.split()[0])
-        return None
+        return html_parsing.extract_age(
+            soup, self.config, self.parser_backend
+        )
 
-    def extract_salary(self, soup: BeautifulSoup) -> Optional[int]:
+    def extract_salary(self, soup: Any) -> Optional[int]:
         """Extracts the salary from the CV if available."""
-        salary_text = self.extract_text(soup, self.config.selectors["salary"])
-        if salary_text:
-            # Remove any non-digit characters
-            salary_digits = "".join(filter(str.isdigit, salary_text))
-            return int(salary_digits) if salary_digits else None
-        return None
-
-    def extract_skills(self, soup: BeautifulSoup) -> List[str]:
+        return html_parsing.extract_salary(
+            soup, self.config, self.parser_backend
+        )
+
+    def extract_skills(self, soup: Any) -> List[str]:
         """Extracts a list of skills from the CV."""
-        return [
-            tag.get_text(strip=True)
-            for tag in soup.select(self.config.selectors["skills"])
-            if tag.get_text(strip=True)
-        ]
+        return html_parsing.extract_skills(
+            soup, self.config, self.parser_backend
+        )
 
-    def exists(self, soup: BeautifulSoup, selector: str) -> bool:
+    def exists(self, soup: Any, selector: str) -> bool:
         """Checks if a certain element exists in the CV
          based on the selector."""
-        return soup.select_one(selector) is not None
+        return html_parsing.exists(soup, selector, self.parser_backend)
 
     async def get_all_cv_data(self, cv_urls: List[str]) -> tuple[Any]:
-        """Fetches and extracts detailed data from all CV URLs."""
-        async with aiohttp.ClientSession() as session:
-            tasks = [self.extract_cv_data(session, url) for url in cv_urls]
-            return await asyncio.gather(*tasks)
+        """Fetches and extracts detailed data from all CV URLs.
+        Concurrency is bounded by the HTTP engine's in-flight limit."""
+        tasks = [self.extract_cv_data(url) for url in cv_urls]
+        return await asyncio.gather(*tasks)
+
+    async def fetch_listing_page(
+        self, page: int
+    ) -> Tuple[List[str], int, float]:
+        """Fetches and parses one listing page.
+        Returns its CV URLs, the page count it shows and the fetch
+        time."""
+        started_at = time.monotonic()
+        html = await self.get_page_html(self.create_url_from_query(page=page))
+        latency = time.monotonic() - started_at
+        STAGE_SECONDS.observe(latency, site=self.site, stage="listing_fetch")
+        try:
+            listing = await self.run_parser(
+                html_parsing.parse_listing_page, html
+            )
+        except Exception as e:
+            self.report_error("parse", "Error extracting CV URLs: %s", e)
+            return [], 1, latency
+        return listing["urls"], listing["total_pages"], latency
+
+    async def iter_listing_pages(
+        self, planner: PaginationPlanner = None
+    ) -> AsyncIterator[List[str]]:
+        """Yields the CV URLs of each listing page as soon as it is
+        parsed. Page 1 is fetched once and gives both the page count
+        and its URLs; the planner then picks further pages in batches sized
+        from observed latency, within the pagination budget."""
+        planner = planner or PaginationPlanner(self.pagination_budget)
+        urls, total_pages, latency = await self.fetch_listing_page(1)
+        planner.start(total_pages)
+        planner.record(latency, len(urls))
+        yield urls
+
+        while pages := planner.next_batch():
+            tasks = [
+                asyncio.create_task(self.fetch_listing_page(page))
+                for page in pages
+            ]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    urls, _, latency = await task
+                    planner.record(latency, len(urls))
+                    yield urls
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def produce_cv_urls(self, url_queue: asyncio.Queue) -> None:
+        """Puts CV URLs into the queue as soon as each listing page
+        is parsed."""
+        seen_urls = set()
+        async for urls in self.iter_listing_pages():
+            for url in urls:
+                if url not in seen_urls:
+                    seen_urls.add(url)
+                    await url_queue.put(url)
+
+    async def stream_cv_data(
+        self, workers: Optional[int] = None
+    ) -> AsyncIterator[CV]:
+        """Yields CVs as soon as their detail pages are parsed.
+        Listing pages feed a queue of CV URLs that a pool of `workers`
+        consumes at the same time, so detail fetches start before the
+        last listing page arrives. Defaults to one worker per
+        in-flight request slot of the HTTP engine."""
+        workers = workers or self.http_engine.config.max_in_flight
+        url_queue = asyncio.Queue()
+        cv_queue = asyncio.Queue()
+
+        async def detail_worker() -> None:
+            while True:
+                url = await url_queue.get()
+                try:
+                    cv = await self.extract_cv_data(url)
+                except Exception as e:
+                    # One bad page must not stop the worker, or the
+                    # queue is never drained and the query hangs
+                    self.report_error(
+                        "detail", "Error processing %s: %s", url, e
+                    )
+                else:
+                    await cv_queue.put(cv)
+                finally:
+                    url_queue.task_done()
+
+        async def run_pipeline() -> None:
+            worker_tasks = [
+                asyncio.create_task(detail_worker()) for _ in range(workers)
+            ]
+            try:
+                await self.produce_cv_urls(url_queue)
+                await url_queue.join()
+            finally:
+                for task in worker_tasks:
+                    task.cancel()
+                await asyncio.gather(*worker_tasks, return_exceptions=True)
+                await cv_queue.put(None)
+
+        pipeline = asyncio.create_task(run_pipeline())
+        try:
+            while (cv := await cv_queue.get()) is not None:
+                yield cv
+            await pipeline
+        finally:
+            pipeline.cancel()
+
+    @staticmethod
+    def get_top_k_cv(
+        cv_data: Iterable[CV], k: int = DEFAULT_TOP_K
+    ) -> List[CV]:
+        """Gets the top K rated CVs, keeping only K of them in memory."""
+        selector = TopKSelector(k)
+        selector.extend(cv_data)
+        return selector.results()
 
     def get_top_5_cv(self, cv_data: List[CV]) -> List[CV]:
         """Gets the top 5 CVs based on their rating."""
-        cv_data.sort(key=lambda x: x.rating, reverse=True)
-        return cv_data[: min(len(cv_data), 5)]
+        return self.get_top_k_cv(cv_data, k=5)
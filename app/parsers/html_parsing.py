@@ -0,0 +1,124 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.parsers.extraction_plan import (
+    age_from_text,
+    get_extraction_plan,
+    salary_from_text,
+)
+from app.parsers.parse_utils import SiteConfig
+from app.parsers.parser_backends import ParserBackend, get_parser_backend
+
+# Module-level functions only: they are sent to worker processes by name,
+# take raw HTML plus a picklable SiteConfig and return plain values.
+# The parser backend is chosen by SiteConfig.parser_backend.
+
+# Bump when parsing changes so that CVs stored by CVStore become stale
+PARSER_VERSION = "html-1"
+
+
+def create_parse_executor(
+    max_workers: Optional[int] = None,
+) -> ProcessPoolExecutor:
+    """Creates a process pool for HTML parsing,
+    sized to the number of CPU cores by default."""
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count())
+
+
+def extract_text(
+    doc: Any, selector: str, backend: ParserBackend = None
+) -> str:
+    """Extracts text content from a given selector."""
+    backend = backend or get_parser_backend()
+    tag = backend.select_one(doc, selector)
+    return backend.text(tag) if tag is not None else "Unknown"
+
+
+def extract_age(
+    doc: Any, config: SiteConfig, backend: ParserBackend = None
+) -> Optional[int]:
+    """Extracts the age from the CV if available."""
+    return age_from_text(extract_text(doc, config.selectors["age"], backend))
+
+
+def extract_salary(
+    doc: Any, config: SiteConfig, backend: ParserBackend = None
+) -> Optional[int]:
+    """Extracts the salary from the CV if available."""
+    return salary_from_text(
+        extract_text(doc, config.selectors["salary"], backend)
+    )
+
+
+def extract_skills(
+    doc: Any, config: SiteConfig, backend: ParserBackend = None
+) -> List[str]:
+    """Extracts a list of skills from the CV."""
+    backend = backend or get_parser_backend()
+    texts = (
+        backend.text(tag)
+        for tag in backend.select(doc, config.selectors["skills"])
+    )
+    return [text for text in texts if text]
+
+
+def exists(doc: Any, selector: str, backend: ParserBackend = None) -> bool:
+    """Checks if a certain element exists in the CV
+     based on the selector."""
+    backend = backend or get_parser_backend()
+    return backend.select_one(doc, selector) is not None
+
+
+def _cv_urls_from_doc(
+    doc: Any, config: SiteConfig, backend: ParserBackend
+) -> List[str]:
+    base_url = config.base_url.replace("-", "")
+    cv_cards = backend.select(doc, config.selectors["cv_card"])
+    return [
+        f"{base_url}{backend.attr(backend.select_one(card, 'a'), 'href')}"
+        for card in cv_cards
+    ]
+
+
+def parse_cv_urls(html: str, config: SiteConfig) -> List[str]:
+    """Parses CV URLs from the HTML content of a listing page."""
+    backend = get_parser_backend(config.parser_backend)
+    return _cv_urls_from_doc(backend.parse(html), config, backend)
+
+
+def _total_pages_from_doc(
+    doc: Any, config: SiteConfig, backend: ParserBackend
+) -> int:
+    pagination = backend.select_one(doc, config.selectors["paginator"])
+    if pagination is not None:
+        last_page_link = backend.select(pagination, "a")[-2]
+        return int(backend.text(last_page_link))
+    return 1
+
+
+def parse_total_pages(html: str, config: SiteConfig) -> int:
+    """Parses the number of result pages from the paginator."""
+    backend = get_parser_backend(config.parser_backend)
+    return _total_pages_from_doc(backend.parse(html), config, backend)
+
+
+def parse_listing_page(html: str, config: SiteConfig) -> Dict[str, Any]:
+    """Parses a listing page once for both its CV URLs and page count."""
+    backend = get_parser_backend(config.parser_backend)
+    doc = backend.parse(html)
+    try:
+        total_pages = _total_pages_from_doc(doc, config, backend)
+    except (IndexError, ValueError):
+        total_pages = 1
+    return {
+        "urls": _cv_urls_from_doc(doc, config, backend),
+        "total_pages": total_pages,
+    }
+
+
+def parse_cv_fields(html: str, config: SiteConfig) -> Dict[str, Any]:
+    """Parses a CV detail page into a dict of CV fields (without url)
+    using the site's compiled extraction plan."""
+    backend = get_parser_backend(config.parser_backend)
+    return get_extraction_plan(config).extract(backend.parse(html), backend)
@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Tuple
+
+import aiohttp
+
+from app.parsers.http_engine import FetchResult, HttpEngine, HttpStatusError
+from app.parsers.metrics import CACHE_REQUESTS
+
+DEFAULT_HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".cache/http")
+DEFAULT_HTTP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachePolicy:
+    # Seconds a stored page is served without asking the server
+    ttl: float
+    # Revalidate expired pages with ETag / Last-Modified
+    revalidate: bool = True
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    stored_at: float
+    size: int
+    encoding: str = "utf-8"
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class HttpCache:
+    def __init__(
+        self,
+        directory: str = DEFAULT_HTTP_CACHE_DIR,
+        max_bytes: int = DEFAULT_HTTP_CACHE_MAX_BYTES,
+        policies: List[Tuple[str, CachePolicy]] = None,
+        default_policy: CachePolicy = None,
+    ) -> None:
+        """Disk-backed HTTP cache with per-URL-pattern TTL policies,
+        conditional revalidation and LRU eviction by total bytes.
+        `policies` is a list of (regex, policy) pairs; the first
+        pattern found in the URL wins."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.policies = [
+            (re.compile(pattern), policy)
+            for pattern, policy in (policies or [])
+        ]
+        self.default_policy = default_policy or CachePolicy(ttl=600)
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, url: str, suffix: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def _load_index(self) -> None:
+        """Rebuilds the in-memory index from the metadata files,
+        ordered by last access (body file mtime)."""
+        loaded = []
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith(".meta"):
+                continue
+            meta_path = os.path.join(self.directory, file_name)
+            try:
+                with open(meta_path, encoding="utf-8") as meta_file:
+                    entry = CacheEntry(**json.load(meta_file))
+                accessed_at = os.path.getmtime(self._path(entry.url, "body"))
+            except (OSError, ValueError, TypeError):
+                continue
+            loaded.append((accessed_at, entry))
+
+        for _, entry in sorted(loaded, key=lambda item: item[0]):
+            self._entries[entry.url] = entry
+            self.total_bytes += entry.size
+
+    def policy_for(self, url: str) -> CachePolicy:
+        """Returns the caching policy for a URL."""
+        for pattern, policy in self.policies:
+            if pattern.search(url):
+                return policy
+        return self.default_policy
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Returns the cache entry for a URL and marks it recently used."""
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.stored_at < self.policy_for(entry.url).ttl
+
+    def read_body(self, entry: CacheEntry) -> Optional[str]:
+        """Reads a stored page. Returns None if its file has vanished."""
+        body_path = self._path(entry.url, "body")
+        try:
+            with open(body_path, "rb") as body_file:
+                body = body_file.read()
+            os.utime(body_path)
+        except OSError:
+            self._remove(entry.url)
+            return None
+        return body.decode(entry.encoding, errors="replace")
+
+    def put(self, result: FetchResult) -> Optional[CacheEntry]:
+        """Stores a successful response and evicts least recently used
+        pages while the cache is over its size limit. Returns None if
+        the page could not be written; the cache is best-effort."""
+        entry = CacheEntry(
+            url=result.url,
+            stored_at=time.time(),
+            size=len(result.body),
+            encoding=result.encoding,
+            etag=result.headers.get("ETag"),
+            last_modified=result.headers.get("Last-Modified"),
+        )
+        try:
+            self._write(self._path(entry.url, "body"), result.body)
+            self._write_meta(entry)
+        except OSError as e:
+            logger.warning("Could not cache %s: %s", entry.url, e)
+            self._remove(entry.url)
+            return None
+
+        previous = self._entries.pop(entry.url, None)
+        if previous is not None:
+            self.total_bytes -= previous.size
+        self._entries[entry.url] = entry
+        self.total_bytes += entry.size
+        self._evict()
+        return entry
+
+    def refresh(self, entry: CacheEntry, result: FetchResult) -> None:
+        """Marks a page as fresh again after a 304 Not Modified."""
+        entry.stored_at = time.time()
+        entry.etag = result.headers.get("ETag", entry.etag)
+        entry.last_modified = result.headers.get(
+            "Last-Modified", entry.last_modified
+        )
+        try:
+            self._write_meta(entry)
+        except OSError as e:
+            logger.warning("Could not refresh cached %s: %s", entry.url, e)
+
+    def _write_meta(self, entry: CacheEntry) -> None:
+        self._write(
+            self._path(entry.url, "meta"),
+            json.dumps(asdict(entry)).encode("utf-8"),
+        )
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        # A temporary file of its own, so processes sharing the
+        # directory can write the same URL at once
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest_url = next(iter(self._entries))
+            self._remove(oldest_url)
+
+    def _remove(self, url: str) -> None:
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+        for suffix in ("body", "meta"):
+            try:
+                os.remove(self._path(url, suffix))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _conditional_headers(entry: CacheEntry) -> dict:
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    async def fetch_text(self, engine: HttpEngine, url: str) -> str:
+        """Returns a page from the cache or the network.
+        Fresh pages are served without a request, expired ones are
+        revalidated with a conditional GET. If the server fails, a
+        stored copy is served instead of an error."""
+        entry = self.get(url)
+        cached_text = None
+        if entry is not None:
+            cached_text = self.read_body(entry)
+            if cached_text is not None and self.is_fresh(entry):
+                CACHE_REQUESTS.inc(cache="http", result="fresh")
+                return cached_text
+
+        headers = None
+        if cached_text is not None and self.policy_for(url).revalidate:
+            headers = self._conditional_headers(entry) or None
+
+        try:
+            result = await engine.fetch(url, headers=headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if cached_text is not None:
+                CACHE_REQUESTS.inc(cache="http", result="stale")
+                return cached_text
+            CACHE_REQUESTS.inc(cache="http", result="miss")
+            raise
+
+        if result.status == 304 and cached_text is not None:
+            CACHE_REQUESTS.inc(cache="http", result="revalidated")
+            self.refresh(entry, result)
+            return cached_text
+        if cached_text is not None and result.status >= 500:
+            CACHE_REQUESTS.inc(cache="http", result="stale")
+            return cached_text
+        CACHE_REQUESTS.inc(cache="http", result="miss")
+        if result.status == 200:
+            self.put(result)
+            return result.text()
+        raise HttpStatusError(url, result.status)
@@ -0,0 +1,152 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Mapping, Optional
+
+import aiohttp
+
+from app.parsers.metrics import site_label, track_request
+from app.parsers.rate_limiter import (
+    AdaptiveRateLimiter,
+    RetryPolicy,
+    default_rate_limiter,
+    send_with_retries,
+)
+
+
+@dataclass
+class HttpEngineConfig:
+    max_connections: int = 100
+    max_connections_per_host: int = 10
+    max_in_flight: int = 20
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30.0
+    request_timeout: float = 30.0
+    headers: dict = field(default_factory=dict)
+
+
+class HttpStatusError(aiohttp.ClientError):
+    def __init__(self, url: str, status: int) -> None:
+        super().__init__(f"Unexpected status {status} for {url}")
+        self.url = url
+        self.status = status
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+    encoding: str = "utf-8"
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def text(self) -> str:
+        return self.body.decode(self.encoding, errors="replace")
+
+
+class HttpEngine:
+    def __init__(
+        self,
+        config: HttpEngineConfig = None,
+        rate_limiter: AdaptiveRateLimiter = None,
+        retry_policy: RetryPolicy = None,
+    ) -> None:
+        """Initializes the engine. The pooled session is created lazily
+        on first use, so the engine can be built outside an event loop.
+        Requests are paced per host by `rate_limiter` (the process-wide
+        limiter by default) and retried according to `retry_policy`."""
+        self.config = config or HttpEngineConfig()
+        self.rate_limiter = rate_limiter or default_rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Returns the shared session, creating it on first access."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.max_connections,
+                limit_per_host=self.config.max_connections_per_host,
+                ttl_dns_cache=self.config.dns_cache_ttl,
+                use_dns_cache=True,
+                keepalive_timeout=self.config.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.config.headers,
+                timeout=aiohttp.ClientTimeout(
+                    total=self.config.request_timeout
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.config.max_in_flight)
+        return self._session
+
+    async def fetch(
+        self,
+        url: str,
+        method: str = "GET",
+        headers: dict = None,
+        data: Optional[str | bytes] = None,
+    ) -> FetchResult:
+        """Performs a request through the pooled session.
+        Waits for the host's rate limiter before each attempt and
+        retries network errors, 429 and 5xx with jittered exponential
+        backoff, honouring Retry-After. The last response is returned
+        even if it is still an error status."""
+        return await send_with_retries(
+            lambda: self._send(url, method, headers, data),
+            url,
+            self.rate_limiter,
+            self.retry_policy,
+            (aiohttp.ClientError, asyncio.TimeoutError),
+            lambda result: result.status,
+        )
+
+    async def _send(
+        self,
+        url: str,
+        method: str,
+        headers: Optional[dict],
+        data: Optional[str | bytes],
+    ) -> FetchResult:
+        """Sends one request, holding a slot of the global
+        in-flight semaphore for its whole duration."""
+        session = self.session
+        async with self._semaphore:
+            with track_request(site_label(url)) as request:
+                async with session.request(
+                    method, url, headers=headers, data=data
+                ) as response:
+                    body = await response.read()
+                    request["status"] = response.status
+                    return FetchResult(
+                        url=url,
+                        status=response.status,
+                        headers=response.headers.copy(),
+                        body=body,
+                        encoding=response.charset or "utf-8",
+                    )
+
+    async def fetch_text(self, url: str) -> str:
+        """Fetches a page and returns its body as text.
+        Raises HttpStatusError on a non-2xx status."""
+        result = await self.fetch(url)
+        if not result.ok:
+            raise HttpStatusError(url, result.status)
+        return result.text()
+
+    async def close(self) -> None:
+        """Closes the pooled session and releases its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "HttpEngine":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
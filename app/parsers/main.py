@@ -1,20 +1,33 @@
+import argparse
 import asyncio
-from typing import List, Callable
+from concurrent.futures import Executor
+from functools import partial
+from typing import List, Callable, Optional
 
-from app.parsers.generic_api_scraper import GenericApiScraper
+from app.parsers.city_index import CityIndex, city_index_path
+from app.parsers.cv_store import CVStore
+from app.parsers.generic_api_scraper import AsyncGenericApiScraper
 from app.parsers.generic_scraper import GenericScraper
-from app.parsers.parse_utils import CV
+from app.parsers.http_cache import HttpCache
+from app.parsers.http_engine import HttpEngine
+from app.parsers.metrics import STAGE_SECONDS
+from app.parsers.pagination import PaginationBudget
+from app.parsers.parse_utils import CV, SiteConfig
+from app.parsers.profiling import RunProfiler
+from app.parsers.top_k import DEFAULT_TOP_K, TopKSelector
 from app.parsers.site_configs.rabota_ua import (
     RABOTA_UA_BASE_URL,
     RABOTA_UA_RESUMES_ENDPOINT,
     RABOTA_UA_CITY_LIST_ENDPOINT,
     RABOTA_UA_EXPERIENCE_DICT,
     RABOTA_UA_HEADERS,
+    RABOTA_UA_PAGINATION_BUDGET,
 )
 from app.parsers.site_configs.work_ua import (
     work_ua_url_generator,
     WORK_UA_EXPERIENCE_CATEGORIES,
     WORK_UA_CONFIG,
+    WORK_UA_PAGINATION_BUDGET,
 )
 
 
@@ -23,26 +36,62 @@ async def get_work_ua_top_5_cvs(
     location: str,
     experience: str,
     url_generator: Callable = work_ua_url_generator,
+    http_engine: HttpEngine = None,
+    top_k: int = DEFAULT_TOP_K,
+    parse_executor: Executor = None,
+    http_cache: HttpCache = None,
+    cv_store: CVStore = None,
+    pagination_budget: PaginationBudget = WORK_UA_PAGINATION_BUDGET,
+    config: SiteConfig = WORK_UA_CONFIG,
+    profiler: RunProfiler = None,
 ) -> List[CV]:
     """Fetch top 5 CVs from Work.ua based on
-     position, location, and experience."""
-    scraper = GenericScraper(
-        config=WORK_UA_CONFIG,
-        experience_categories=WORK_UA_EXPERIENCE_CATEGORIES,
-        position=position,
-        location=location,
-        experience=experience,
-        url_generator=url_generator,
-    )
-    urls = await scraper.get_all_cv_urls()
-    cv_data = await scraper.get_all_cv_data(urls)
-    for cv in cv_data:
-        cv.calculate_rating()
-
-    return scraper.get_top_5_cv(cv_data)
-
-
-def get_rabota_ua_top_5_cvs(
+     position, location, and experience.
+     Pass a shared `http_engine` to reuse one connection pool
+     across queries, `top_k` to change the result size,
+     `parse_executor` to parse HTML off the event loop,
+     `http_cache` to reuse pages downloaded by earlier queries and
+     `cv_store` to reuse CVs parsed by earlier queries.
+     `pagination_budget` caps how many result pages are crawled.
+     `config` overrides the site configuration, e.g. its base URL.
+     The run is profiled by `profiler` when one is given, or when
+     the SCRAPER_PROFILE env var is set. A profiled run gets a thread,
+     event loop and HttpEngine of its own (see RunProfiler.run) and
+     skips `http_cache` and `cv_store`, which are not thread-safe."""
+
+    async def search(
+        engine: Optional[HttpEngine],
+        cache: Optional[HttpCache],
+        store: Optional[CVStore],
+    ) -> List[CV]:
+        async with GenericScraper(
+            config=config,
+            experience_categories=WORK_UA_EXPERIENCE_CATEGORIES,
+            position=position,
+            location=location,
+            experience=experience,
+            url_generator=url_generator,
+            http_engine=engine,
+            parse_executor=parse_executor,
+            http_cache=cache,
+            cv_store=store,
+            pagination_budget=pagination_budget,
+        ) as scraper:
+            selector = TopKSelector(top_k)
+            async for cv in scraper.stream_cv_data():
+                with STAGE_SECONDS.time(site=scraper.site, stage="rating"):
+                    cv.calculate_rating()
+                    selector.push(cv)
+        return selector.results()
+
+    profiler = profiler or RunProfiler.from_env("work_ua")
+    if profiler.enabled:
+        # The shared engine's session belongs to the calling loop
+        return await profiler.run(partial(search, None, None, None))
+    return await search(http_engine, http_cache, cv_store)
+
+
+async def get_rabota_ua_top_5_cvs(
     candidate_position: str,
     canditate_city: str,
     canditate_experience: str,
@@ -51,29 +100,56 @@ def get_rabota_ua_top_5_cvs(
     city_list_api_endpoint: str = RABOTA_UA_CITY_LIST_ENDPOINT,
     headers: dict = RABOTA_UA_HEADERS,
     experience_categories: dict = RABOTA_UA_EXPERIENCE_DICT,
+    top_k: int = DEFAULT_TOP_K,
+    profiler: RunProfiler = None,
+    http_engine: HttpEngine = None,
+    pagination_budget: PaginationBudget = RABOTA_UA_PAGINATION_BUDGET,
 ) -> List[CV]:
     """Fetch top 5 CVs from Rabota.ua based on candidate's
-     position, city, and experience."""
-    rabota_ua_api = GenericApiScraper(
-        base_url=base_api_url,
-        resumes_endpoint=resumes_endpoint,
-        city_list_endpoint=city_list_api_endpoint,
-        headers=headers,
-        experience_categories=experience_categories,
-    )
-
-    resumes_result = rabota_ua_api.get_resumes(
-        position=candidate_position,
-        city_name=canditate_city,
-        experience_label=canditate_experience,
-    )
-
-    top_5_cvs = rabota_ua_api.get_top_5_cv(resumes_result.get("documents", []))
-
-    return top_5_cvs
-
-
-async def test_parsers() -> None:
+     position, city, and experience.
+     Pass a shared `http_engine` to reuse one connection pool
+     across queries. Result pages are fetched concurrently and merged
+     into one top K until `pagination_budget` is spent.
+     The run is profiled by `profiler` when one is given, or when
+     the SCRAPER_PROFILE env var is set. A profiled run gets a thread,
+     event loop, HttpEngine and city index of its own
+     (see RunProfiler.run)."""
+
+    async def search(
+        engine: Optional[HttpEngine], city_index: Optional[CityIndex]
+    ) -> List[CV]:
+        async with AsyncGenericApiScraper(
+            base_url=base_api_url,
+            resumes_endpoint=resumes_endpoint,
+            city_list_endpoint=city_list_api_endpoint,
+            headers=headers,
+            experience_categories=experience_categories,
+            city_index=city_index,
+            http_engine=engine,
+        ) as rabota_ua_api:
+            selector = TopKSelector(top_k)
+            async for resumes in rabota_ua_api.iter_resume_pages(
+                position=candidate_position,
+                city_name=canditate_city,
+                experience_label=canditate_experience,
+                budget=pagination_budget,
+            ):
+                rabota_ua_api.push_resumes(selector, resumes)
+        return selector.results()
+
+    profiler = profiler or RunProfiler.from_env("rabota_ua")
+    if profiler.enabled:
+        # The shared engine's session belongs to the calling loop, and
+        # a refresh of the shared city index started on the profiled
+        # loop would be cancelled when that loop closes
+        city_index = CityIndex(
+            city_index_path(base_api_url + city_list_api_endpoint)
+        )
+        return await profiler.run(partial(search, None, city_index))
+    return await search(http_engine, None)
+
+
+async def test_parsers(profile: bool = False) -> None:
     position = "python"
     skills = "python Django"
     location = "Київ"
@@ -84,13 +160,15 @@ async def test_parsers() -> None:
         position=position,
         location=location,
         experience=experience,
+        profiler=RunProfiler("work_ua") if profile else None,
     )
 
     # Fetch top 5 CVs from Rabota.ua
-    rabota_ua_top_5_cv = get_rabota_ua_top_5_cvs(
+    rabota_ua_top_5_cv = await get_rabota_ua_top_5_cvs(
         candidate_position=skills,
         canditate_city=location,
         canditate_experience=experience,
+        profiler=RunProfiler("rabota_ua") if profile else None,
     )
 
     print("\n\nWORK.UA TOP 5 --------->\n\n", work_ua_top_5_cv)
@@ -98,4 +176,10 @@ async def test_parsers() -> None:
 
 
 if __name__ == "__main__":
-    asyncio.run(test_parsers())
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write a profile report of each run to SCRAPER_PROFILE_DIR.",
+    )
+    asyncio.run(test_parsers(profile=parser.parse_args().profile))
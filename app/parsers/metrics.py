@@ -0,0 +1,330 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from aiohttp import web
+
+DEFAULT_METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Off unless set, e.g. METRICS_PORT=9108
+DEFAULT_METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; suits single requests and parse calls
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Seconds; suits whole bot queries that crawl many pages
+QUERY_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def site_label(url: str) -> str:
+    """The `site` / `host` label of a URL: its host name."""
+    return urlsplit(url).netloc
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        """Holds metrics and renders them in the Prometheus text
+        exposition format."""
+        self._metrics: List["Metric"] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric") -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        return "".join(metric.render() for metric in metrics)
+
+
+REGISTRY = MetricsRegistry()
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = REGISTRY,
+    ) -> None:
+        """A metric family; values are kept per label combination.
+        Thread-safe, so synchronous scrapers running in worker
+        threads can update it too."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, "
+                f"got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            ("", _format_labels(self.labelnames, key), value)
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """Counts the enclosed block as in progress."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[MetricsRegistry] = REGISTRY,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts with a trailing +Inf slot, sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(
+                key, ([0] * (len(self.buckets) + 1), 0.0)
+            )
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observes how long the enclosed block takes, in seconds."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+            return sum(counts)
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self._values.items()
+            )
+        names = self.labelnames + ("le",)
+        samples = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                samples.append(("_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        return samples
+
+
+HTTP_REQUESTS = Counter(
+    "scraper_http_requests_total",
+    "HTTP responses received, by host and status "
+    "('error' for network failures).",
+    ("host", "status"),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "scraper_http_request_seconds",
+    "Duration of single HTTP requests.",
+    ("host",),
+)
+HTTP_RETRIES = Counter(
+    "scraper_http_retries_total",
+    "HTTP requests retried after an error, 429 or 5xx.",
+    ("host",),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "scraper_http_in_flight",
+    "HTTP requests currently being sent.",
+    ("host",),
+)
+
+
+@contextmanager
+def track_request(host: str) -> Iterator[Dict[str, object]]:
+    """Records one HTTP request in the in-flight gauge, the duration
+    histogram and the request counter. Set "status" in the yielded
+    dict once a response arrives; otherwise it counts as an error."""
+    request: Dict[str, object] = {"status": "error"}
+    try:
+        with HTTP_IN_FLIGHT.track(host=host), (
+            HTTP_REQUEST_SECONDS.time(host=host)
+        ):
+            yield request
+    finally:
+        HTTP_REQUESTS.inc(host=host, status=request["status"])
+
+
+STAGE_SECONDS = Histogram(
+    "scraper_stage_seconds",
+    "Time spent in a query stage: listing_fetch, detail_fetch, "
+    "rating or telegram_send.",
+    ("site", "stage"),
+)
+PARSE_SECONDS = Histogram(
+    "scraper_parse_seconds",
+    "Duration of HTML parse calls, including executor hand-off.",
+    ("site", "parser"),
+)
+CACHE_REQUESTS = Counter(
+    "scraper_cache_requests_total",
+    "Cache lookups by cache and result.",
+    ("cache", "result"),
+)
+ERRORS = Counter(
+    "scraper_errors_total",
+    "Errors handled by the scrapers, by stage.",
+    ("site", "stage"),
+)
+QUERIES_IN_PROGRESS = Gauge(
+    "scraper_queries_in_progress",
+    "Bot queries currently being answered.",
+    ("site",),
+)
+COALESCED_QUERIES = Counter(
+    "scraper_coalesced_queries_total",
+    "Bot queries answered by joining an equal query already in flight.",
+    ("site",),
+)
+QUERY_SECONDS = Histogram(
+    "scraper_query_seconds",
+    "End-to-end latency of bot queries, from the start of their "
+    "scrape job to the last message sent.",
+    ("site",),
+    buckets=QUERY_BUCKETS,
+)
+JOBS_QUEUED = Gauge(
+    "scraper_jobs_queued",
+    "Scrape jobs waiting for a worker.",
+    ("site",),
+)
+JOB_WAIT_SECONDS = Histogram(
+    "scraper_job_wait_seconds",
+    "Time scrape jobs spent queued before a worker picked them.",
+    ("site",),
+    buckets=(0.1, 0.5) + QUERY_BUCKETS,
+)
+TELEGRAM_FLOOD_WAITS = Counter(
+    "scraper_telegram_flood_waits_total",
+    "Bot messages held back by a RetryAfter from Telegram.",
+)
+
+
+async def start_metrics_server(
+    host: str = DEFAULT_METRICS_HOST,
+    port: int = DEFAULT_METRICS_PORT,
+    registry: MetricsRegistry = REGISTRY,
+) -> web.AppRunner:
+    """Serves the registry on http://host:port/metrics.
+    Returns the runner; call its `cleanup()` to stop the server."""
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            body=registry.render().encode("utf-8"),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
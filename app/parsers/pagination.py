@@ -0,0 +1,88 @@
+import math
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class PaginationBudget:
+    # Never fetch more listing pages than this
+    max_pages: Optional[int] = None
+    # Stop once this many CV cards have been collected
+    max_candidates: Optional[int] = None
+
+
+class PaginationPlanner:
+    def __init__(
+        self,
+        budget: PaginationBudget = None,
+        min_concurrency: int = 1,
+        max_concurrency: int = 10,
+        target_latency: float = 2.0,
+    ) -> None:
+        """Plans which listing pages to fetch and how many at once.
+        Page 1 is fetched on its own to learn the page count; after
+        that pages go out in batches whose size grows by one while
+        pages come back faster than `target_latency` seconds and is
+        halved when they are slower."""
+        self.budget = budget or PaginationBudget()
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.concurrency = min_concurrency
+        self.total_pages = 1
+        self.next_page = 2
+        self.candidates = 0
+        self._latencies: List[float] = []
+
+    def start(self, total_pages: int) -> None:
+        """Sets the page count read from the first page."""
+        self.total_pages = total_pages
+        if self.budget.max_pages is not None:
+            self.total_pages = min(self.total_pages, self.budget.max_pages)
+
+    def record(self, latency: float, candidates: int) -> None:
+        """Records how long a page took and how many cards it had."""
+        self._latencies.append(latency)
+        self.candidates += candidates
+
+    @property
+    def done(self) -> bool:
+        if self.next_page > self.total_pages:
+            return True
+        max_candidates = self.budget.max_candidates
+        return max_candidates is not None and (
+            self.candidates >= max_candidates
+        )
+
+    def _adjust_concurrency(self) -> None:
+        if not self._latencies:
+            return
+        mean_latency = sum(self._latencies) / len(self._latencies)
+        self._latencies.clear()
+        if mean_latency <= self.target_latency:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+        else:
+            self.concurrency = max(
+                self.min_concurrency, math.ceil(self.concurrency / 2)
+            )
+
+    def next_batch(self) -> List[int]:
+        """Returns the pages to fetch concurrently next,
+        or an empty list when the crawl is over."""
+        if self.done:
+            return []
+        self._adjust_concurrency()
+        batch_size = self.concurrency
+        max_candidates = self.budget.max_candidates
+        if max_candidates is not None and self.candidates:
+            # Cards per page so far tell how many pages are still needed
+            pages_seen = self.next_page - 1
+            per_page = max(1, self.candidates // pages_seen)
+            pages_needed = math.ceil(
+                (max_candidates - self.candidates) / per_page
+            )
+            batch_size = min(batch_size, pages_needed)
+        last_page = min(self.total_pages, self.next_page + batch_size - 1)
+        batch = list(range(self.next_page, last_page + 1))
+        self.next_page = last_page + 1
+        return batch
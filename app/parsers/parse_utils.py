@@ -1,14 +1,30 @@
 from dataclasses import dataclass
 from typing import List, Optional
 
+# Rating points given by CV.calculate_rating (and CVBatch)
+PRIME_AGES = (25, 35)
+PRIME_AGE_POINTS = 3
+MATURE_AGES = (36, 45)
+MATURE_AGE_POINTS = 2
+OTHER_AGE_POINTS = 1
+SKILL_POINTS = 2
+EDUCATION_POINTS = 3
+ADDITIONAL_EDUCATION_POINTS = 2
+LANGUAGES_POINTS = 2
+ADDITIONAL_INFO_POINTS = 1
+SALARY_POINTS = 1
+PHOTO_POINTS = 19
+
 
 @dataclass
 class SiteConfig:
     base_url: str
     selectors: dict[str, str]
+    # One of "bs4", "lxml", "selectolax" (see parser_backends)
+    parser_backend: str = "bs4"
 
 
-@dataclass
+@dataclass(slots=True)
 class CV:
     name: str
     age: Optional[int]
@@ -28,31 +44,31 @@ class CV:
         rating = 0
 
         if self.age:
-            if 25 <= self.age <= 35:
-                rating += 3
-            elif 36 <= self.age <= 45:
-                rating += 2
+            if PRIME_AGES[0] <= self.age <= PRIME_AGES[1]:
+                rating += PRIME_AGE_POINTS
+            elif MATURE_AGES[0] <= self.age <= MATURE_AGES[1]:
+                rating += MATURE_AGE_POINTS
             else:
-                rating += 1
+                rating += OTHER_AGE_POINTS
 
-        rating += len(self.skills) * 2
+        rating += len(self.skills) * SKILL_POINTS
 
         if self.education:
-            rating += 3
+            rating += EDUCATION_POINTS
 
         if self.additional_education_exists:
-            rating += 2
+            rating += ADDITIONAL_EDUCATION_POINTS
 
         if self.languages_exist:
-            rating += 2
+            rating += LANGUAGES_POINTS
 
         if self.additional_info:
-            rating += 1
+            rating += ADDITIONAL_INFO_POINTS
 
         if self.salary:
-            rating += 1
+            rating += SALARY_POINTS
 
         if self.photo:
-            rating += 19
+            rating += PHOTO_POINTS
 
         self.rating = rating
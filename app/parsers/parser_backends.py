@@ -0,0 +1,251 @@
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, List, Optional
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+DEFAULT_PARSER_BACKEND = "bs4"
+
+CONTAINS_SELECTOR_PATTERN = re.compile(
+    r"^(?P<base>.+?):-soup-contains\((?P<quote>['\"])(?P<text>.*?)(?P=quote)\)"
+    r"(?:\s*\+\s*(?P<sibling>[\w-]+))?$"
+)
+
+
+@dataclass(frozen=True)
+class ContainsSelector:
+    base: str
+    text: str
+    sibling: Optional[str] = None
+
+
+@lru_cache(maxsize=None)
+def parse_contains_selector(selector: str) -> Optional[ContainsSelector]:
+    """Splits a `:-soup-contains` selector into its parts.
+    Supports `<css>:-soup-contains('<text>')` optionally followed by
+    `+ <tag>`, which are the forms used by the site configs.
+    Returns None for plain CSS selectors."""
+    match = CONTAINS_SELECTOR_PATTERN.match(selector.strip())
+    if not match:
+        return None
+    return ContainsSelector(
+        base=match.group("base").strip(),
+        text=match.group("text"),
+        sibling=match.group("sibling"),
+    )
+
+
+class ParserBackend(ABC):
+    """Common interface of the HTML parser backends.
+    Subclasses implement the primitive node operations; `select` and
+    `select_one` add support for `:-soup-contains` selectors on top of
+    the backend's native CSS engine."""
+
+    name: str = ""
+
+    @abstractmethod
+    def parse(self, html: str) -> Any:
+        """Parses an HTML document into the backend's root node."""
+
+    @abstractmethod
+    def css_select(self, node: Any, css: str) -> List[Any]:
+        """Selects nodes with a plain CSS selector."""
+
+    @abstractmethod
+    def text(self, node: Any) -> str:
+        """Returns the node text with every text piece stripped,
+        like BeautifulSoup's get_text(strip=True)."""
+
+    @abstractmethod
+    def raw_text(self, node: Any) -> str:
+        """Returns the node text as is."""
+
+    @abstractmethod
+    def attr(self, node: Any, name: str) -> Optional[str]:
+        """Returns an attribute of the node, or None."""
+
+    @abstractmethod
+    def tag_name(self, node: Any) -> str:
+        """Returns the tag name of the node."""
+
+    @abstractmethod
+    def next_element_sibling(self, node: Any) -> Any:
+        """Returns the next element sibling of the node, or None."""
+
+    def select(self, node: Any, selector: str) -> List[Any]:
+        """Selects nodes, resolving `:-soup-contains` selectors."""
+        contains = parse_contains_selector(selector)
+        if contains is None:
+            return self.css_select(node, selector)
+
+        matches = [
+            candidate
+            for candidate in self.css_select(node, contains.base)
+            if contains.text in self.raw_text(candidate)
+        ]
+        if contains.sibling is None:
+            return matches
+
+        siblings = []
+        for match in matches:
+            sibling = self.next_element_sibling(match)
+            if (
+                sibling is not None
+                and self.tag_name(sibling) == contains.sibling
+            ):
+                siblings.append(sibling)
+        return siblings
+
+    def select_one(self, node: Any, selector: str) -> Any:
+        """Selects the first matching node or None."""
+        nodes = self.select(node, selector)
+        return nodes[0] if nodes else None
+
+
+class BeautifulSoupBackend(ParserBackend):
+    name = "bs4"
+
+    def __init__(self, features: str = "html.parser") -> None:
+        self.features = features
+        self._compiled = {}
+
+    def parse(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(html, self.features)
+
+    def _compile(self, css: str) -> Any:
+        compiled = self._compiled.get(css)
+        if compiled is None:
+            compiled = soupsieve.compile(css)
+            self._compiled[css] = compiled
+        return compiled
+
+    def css_select(self, node: Any, css: str) -> List[Any]:
+        return self._compile(css).select(node)
+
+    def select(self, node: Any, selector: str) -> List[Any]:
+        # soupsieve understands `:-soup-contains` natively
+        return self._compile(selector).select(node)
+
+    def select_one(self, node: Any, selector: str) -> Any:
+        return self._compile(selector).select_one(node)
+
+    def text(self, node: Any) -> str:
+        return node.get_text(strip=True)
+
+    def raw_text(self, node: Any) -> str:
+        return node.get_text()
+
+    def attr(self, node: Any, name: str) -> Optional[str]:
+        return node.get(name)
+
+    def tag_name(self, node: Any) -> str:
+        return node.name
+
+    def next_element_sibling(self, node: Any) -> Any:
+        return node.find_next_sibling()
+
+
+class LxmlBackend(ParserBackend):
+    name = "lxml"
+
+    def __init__(self) -> None:
+        try:
+            import lxml.html
+            from lxml.cssselect import CSSSelector
+        except ImportError as e:
+            raise ImportError(
+                "The 'lxml' parser backend requires "
+                "the lxml and cssselect packages."
+            ) from e
+        self._lxml_html = lxml.html
+        self._css_selector = CSSSelector
+        self._compiled = {}
+
+    def parse(self, html: str) -> Any:
+        return self._lxml_html.document_fromstring(html or "<html></html>")
+
+    def css_select(self, node: Any, css: str) -> List[Any]:
+        compiled = self._compiled.get(css)
+        if compiled is None:
+            compiled = self._css_selector(css, translator="html")
+            self._compiled[css] = compiled
+        return compiled(node)
+
+    def text(self, node: Any) -> str:
+        return "".join(piece.strip() for piece in node.itertext())
+
+    def raw_text(self, node: Any) -> str:
+        return node.text_content()
+
+    def attr(self, node: Any, name: str) -> Optional[str]:
+        return node.get(name)
+
+    def tag_name(self, node: Any) -> str:
+        return node.tag
+
+    def next_element_sibling(self, node: Any) -> Any:
+        sibling = node.getnext()
+        while sibling is not None and not isinstance(sibling.tag, str):
+            sibling = sibling.getnext()
+        return sibling
+
+
+class SelectolaxBackend(ParserBackend):
+    name = "selectolax"
+
+    def __init__(self) -> None:
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError as e:
+            raise ImportError(
+                "The 'selectolax' parser backend requires "
+                "the selectolax package."
+            ) from e
+        self._parser = LexborHTMLParser
+
+    def parse(self, html: str) -> Any:
+        return self._parser(html or "")
+
+    def css_select(self, node: Any, css: str) -> List[Any]:
+        return node.css(css)
+
+    def text(self, node: Any) -> str:
+        return node.text(deep=True, separator="", strip=True)
+
+    def raw_text(self, node: Any) -> str:
+        return node.text(deep=True)
+
+    def attr(self, node: Any, name: str) -> Optional[str]:
+        return node.attributes.get(name)
+
+    def tag_name(self, node: Any) -> str:
+        return node.tag
+
+    def next_element_sibling(self, node: Any) -> Any:
+        sibling = node.next
+        while sibling is not None and not sibling.is_element_node:
+            sibling = sibling.next
+        return sibling
+
+
+PARSER_BACKENDS = {
+    BeautifulSoupBackend.name: BeautifulSoupBackend,
+    LxmlBackend.name: LxmlBackend,
+    SelectolaxBackend.name: SelectolaxBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_parser_backend(name: str = DEFAULT_PARSER_BACKEND) -> ParserBackend:
+    """Returns a shared instance of the named parser backend."""
+    try:
+        backend_class = PARSER_BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown parser backend '{name}'. "
+            f"Available: {', '.join(PARSER_BACKENDS)}."
+        )
+    return backend_class()
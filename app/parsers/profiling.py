@@ -0,0 +1,166 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+DEFAULT_PROFILE_DIR = os.getenv("SCRAPER_PROFILE_DIR", ".cache/profiles")
+# Profile every scrape run when set, e.g. SCRAPER_PROFILE=1
+PROFILE_FROM_ENV = os.getenv("SCRAPER_PROFILE", "").lower() in (
+    "1", "true", "yes"
+)
+# Functions listed in the cProfile part of the report
+REPORT_FUNCTIONS = 40
+
+T = TypeVar("T")
+
+_active = threading.local()
+
+
+class RunProfiler:
+    def __init__(
+        self,
+        name: str,
+        directory: str = DEFAULT_PROFILE_DIR,
+        enabled: bool = True,
+    ) -> None:
+        """Profiles one scrape run with cProfile and, when entered on
+        a running event loop, times every asyncio task it creates.
+        On exit a `.prof` file and a readable `.txt` report are
+        written to `directory`; `report_path` points at the latter.
+        Entered directly, it sees everything on the calling thread
+        and counts that thread's CPU time;
+        use `run` to profile a coroutine in isolation. A disabled
+        profiler does nothing, and a profiler entered while another
+        one is active in the same thread is a no-op."""
+        self.name = name
+        self.directory = directory
+        self.enabled = enabled
+        self.report_path: Optional[str] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._previous_factory = None
+        self._task_times: Dict[str, List[float]] = defaultdict(list)
+        self._pending_tasks = 0
+
+    @classmethod
+    def from_env(cls, name: str) -> "RunProfiler":
+        """A profiler enabled by the SCRAPER_PROFILE env var.
+        Without it the shared disabled profiler is returned."""
+        if not PROFILE_FROM_ENV:
+            return DISABLED_PROFILER
+        return cls(name)
+
+    async def run(self, search: Callable[[], Awaitable[T]]) -> T:
+        """Runs `search()` on an event loop of its own in a separate
+        thread and profiles it there. cProfile and the task factory
+        then only see this run, not other coroutines of the calling
+        loop, and several runs can be profiled at once. The reported
+        CPU time is that of this thread only. `search` must not use
+        objects shared with the calling loop, such as the session of
+        a shared HttpEngine or the bot's caches."""
+
+        async def profiled() -> T:
+            with self:
+                return await search()
+
+        return await asyncio.to_thread(lambda: asyncio.run(profiled()))
+
+    def __enter__(self) -> "RunProfiler":
+        if not self.enabled or getattr(_active, "profiler", None):
+            return self
+        _active.profiler = self
+        self._task_times.clear()
+        self._pending_tasks = 0
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        if self._loop is not None:
+            self._previous_factory = self._loop.get_task_factory()
+            self._loop.set_task_factory(self._task_factory)
+        self._started_at = time.perf_counter()
+        self._cpu_started_at = time.thread_time()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if getattr(_active, "profiler", None) is not self:
+            return
+        self._profile.disable()
+        wall_time = time.perf_counter() - self._started_at
+        cpu_time = time.thread_time() - self._cpu_started_at
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+        _active.profiler = None
+        self.report_path = self._write_report(wall_time, cpu_time)
+
+    def _task_factory(self, loop, coro, **kwargs) -> asyncio.Task:
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        name = getattr(coro, "__qualname__", type(coro).__name__)
+        created_at = time.perf_counter()
+        self._pending_tasks += 1
+
+        def on_done(_: asyncio.Task) -> None:
+            self._pending_tasks -= 1
+            self._task_times[name].append(time.perf_counter() - created_at)
+
+        task.add_done_callback(on_done)
+        return task
+
+    def _task_lines(self) -> List[str]:
+        if self._loop is None:
+            return ["No event loop: the run was synchronous."]
+        lines = [
+            f"{'tasks':>6} {'total s':>9} {'mean s':>8} {'max s':>8}  "
+            "coroutine"
+        ]
+        by_total = sorted(
+            self._task_times.items(), key=lambda item: -sum(item[1])
+        )
+        for name, durations in by_total:
+            lines.append(
+                f"{len(durations):>6} {sum(durations):>9.3f} "
+                f"{sum(durations) / len(durations):>8.3f} "
+                f"{max(durations):>8.3f}  {name}"
+            )
+        lines.append(f"Tasks still pending at exit: {self._pending_tasks}")
+        return lines
+
+    def _write_report(self, wall_time: float, cpu_time: float) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        base_path = os.path.join(self.directory, f"{stamp}-{self.name}")
+        self._profile.dump_stats(f"{base_path}.prof")
+
+        stats_output = io.StringIO()
+        pstats.Stats(self._profile, stream=stats_output).sort_stats(
+            "cumulative"
+        ).print_stats(REPORT_FUNCTIONS)
+
+        report = [
+            f"Profile of {self.name}",
+            f"Wall time: {wall_time:.3f} s, CPU time: {cpu_time:.3f} s",
+            f"Raw profile: {base_path}.prof",
+            "",
+            "asyncio tasks",
+            *self._task_lines(),
+            "",
+            "cProfile, by cumulative time",
+            stats_output.getvalue(),
+        ]
+        with open(f"{base_path}.txt", "w", encoding="utf-8") as report_file:
+            report_file.write("\n".join(report))
+        return f"{base_path}.txt"
+
+
+DISABLED_PROFILER = RunProfiler("disabled", enabled=False)
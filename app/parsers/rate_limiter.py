@@ -0,0 +1,280 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from urllib.parse import urlsplit
+
+from app.parsers.metrics import HTTP_RETRIES, site_label
+
+R = TypeVar("R")
+
+
+@dataclass
+class RateLimitConfig:
+    # Requests per second each host starts with
+    initial_rate: float = 10.0
+    min_rate: float = 0.5
+    max_rate: float = 50.0
+    # Requests a host may receive at once after being idle
+    burst: int = 10
+    # Additive increase after every successful request
+    increase_step: float = 0.5
+    # Multiplicative decrease after a 429 / 5xx
+    decrease_factor: float = 0.5
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    retry_statuses: tuple = (429, 500, 502, 503, 504)
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for a retry attempt."""
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** attempt)
+        )
+
+    def delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Seconds to wait before the next attempt, never shorter
+        than a server-provided Retry-After."""
+        return max(retry_after or 0.0, self.backoff(attempt))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int) -> None:
+        """A token bucket that hands out reservations instead of
+        blocking, so it can serve both threads and coroutines."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """Takes one token and returns how long to wait before using it."""
+        now = time.monotonic()
+        self.refill(now)
+        self.tokens -= 1
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def block_for(self, seconds: float) -> None:
+        """Holds back every request for the given number of seconds."""
+        self.blocked_until = max(
+            self.blocked_until, time.monotonic() + seconds
+        )
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, config: RateLimitConfig = None) -> None:
+        """Per-host token buckets whose rate follows AIMD: it grows a
+        little after each success and is cut after a 429 or 5xx."""
+        self.config = config or RateLimitConfig()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlsplit(url).netloc
+
+    def _bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.config.initial_rate, self.config.burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    def rate(self, url: str) -> float:
+        """Returns the current request rate allowed for the URL's host."""
+        with self._lock:
+            return self._bucket(self.host_of(url)).rate
+
+    def reserve(self, url: str) -> float:
+        with self._lock:
+            return self._bucket(self.host_of(url)).reserve()
+
+    async def acquire(self, url: str) -> None:
+        """Waits until a request to the URL's host is allowed."""
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, url: str) -> None:
+        """Blocking variant of `acquire` for synchronous clients."""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_success(self, url: str) -> None:
+        with self._lock:
+            bucket = self._bucket(self.host_of(url))
+            bucket.rate = min(
+                self.config.max_rate, bucket.rate + self.config.increase_step
+            )
+
+    def on_throttle(self, url: str, retry_after: float = None) -> None:
+        """Slows the host down after a 429 / 5xx and honours
+        the server's Retry-After."""
+        with self._lock:
+            bucket = self._bucket(self.host_of(url))
+            bucket.refill(time.monotonic())
+            bucket.rate = max(
+                self.config.min_rate,
+                bucket.rate * self.config.decrease_factor,
+            )
+            if retry_after:
+                bucket.block_for(retry_after)
+
+
+# Shared by every client in the process so limits hold per host
+default_rate_limiter = AdaptiveRateLimiter()
+
+
+def _network_error_delay(
+    url: str,
+    rate_limiter: AdaptiveRateLimiter,
+    retry_policy: RetryPolicy,
+    attempt: int,
+) -> Optional[float]:
+    """Records a failed attempt and returns the seconds to wait before
+    the next one, or None when the retries ran out."""
+    rate_limiter.on_throttle(url)
+    if attempt >= retry_policy.max_retries:
+        return None
+    HTTP_RETRIES.inc(host=site_label(url))
+    return retry_policy.delay(attempt, None)
+
+
+def _response_delay(
+    url: str,
+    status: int,
+    headers: Mapping[str, str],
+    rate_limiter: AdaptiveRateLimiter,
+    retry_policy: RetryPolicy,
+    attempt: int,
+) -> Optional[float]:
+    """Records a response and returns the seconds to wait before the
+    next attempt, or None when the response is final: a success, a
+    status that is not retried or the last allowed retry."""
+    if status not in retry_policy.retry_statuses:
+        rate_limiter.on_success(url)
+        return None
+    retry_after = parse_retry_after(headers.get("Retry-After"))
+    rate_limiter.on_throttle(url, retry_after)
+    if attempt >= retry_policy.max_retries:
+        return None
+    HTTP_RETRIES.inc(host=site_label(url))
+    return retry_policy.delay(attempt, retry_after)
+
+
+async def send_with_retries(
+    send: Callable[[], Awaitable[R]],
+    url: str,
+    rate_limiter: AdaptiveRateLimiter,
+    retry_policy: RetryPolicy,
+    network_errors: Tuple[type, ...],
+    status_of: Callable[[R], int],
+    sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+) -> R:
+    """Sends a request with `send` until it succeeds or the retries
+    run out. Waits for the host's rate limiter before each attempt and
+    retries `network_errors`, 429 and 5xx with jittered exponential
+    backoff, honouring Retry-After. The last response is returned even
+    if it is still an error status."""
+    attempt = 0
+    while True:
+        wait = rate_limiter.reserve(url)
+        if wait > 0:
+            await sleep(wait)
+        try:
+            response = await send()
+        except network_errors:
+            delay = _network_error_delay(
+                url, rate_limiter, retry_policy, attempt
+            )
+            if delay is None:
+                raise
+        else:
+            delay = _response_delay(
+                url,
+                status_of(response),
+                response.headers,
+                rate_limiter,
+                retry_policy,
+                attempt,
+            )
+            if delay is None:
+                return response
+        await sleep(delay)
+        attempt += 1
+
+
+def send_with_retries_sync(
+    send: Callable[[], R],
+    url: str,
+    rate_limiter: AdaptiveRateLimiter,
+    retry_policy: RetryPolicy,
+    network_errors: Tuple[type, ...],
+    status_of: Callable[[R], int],
+    sleep: Callable[[float], None] = time.sleep,
+) -> R:
+    """Blocking variant of `send_with_retries` for synchronous clients,
+    with the same rate limiting, backoff and Retry-After handling."""
+    attempt = 0
+    while True:
+        wait = rate_limiter.reserve(url)
+        if wait > 0:
+            sleep(wait)
+        try:
+            response = send()
+        except network_errors:
+            delay = _network_error_delay(
+                url, rate_limiter, retry_policy, attempt
+            )
+            if delay is None:
+                raise
+        else:
+            delay = _response_delay(
+                url,
+                status_of(response),
+                response.headers,
+                rate_limiter,
+                retry_policy,
+                attempt,
+            )
+            if delay is None:
+                return response
+        sleep(delay)
+        attempt += 1
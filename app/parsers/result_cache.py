@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from app.parsers.metrics import CACHE_REQUESTS
+from app.parsers.parse_utils import CV
+
+DEFAULT_RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", ".cache/results")
+# Seconds an answer is served as is
+DEFAULT_RESULT_FRESH_FOR = float(os.getenv("RESULT_CACHE_FRESH_FOR", "600"))
+# Seconds after that it is still served, while refreshed in the background
+DEFAULT_RESULT_STALE_FOR = float(os.getenv("RESULT_CACHE_STALE_FOR", "3600"))
+DEFAULT_RESULT_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "512"))
+
+logger = logging.getLogger(__name__)
+
+# Runs a background refresh: gets the query key and the coroutine
+# function doing it, returns False when the refresh was not taken
+RefreshScheduler = Callable[
+    [Tuple[str, ...], Callable[[], Awaitable[None]]], bool
+]
+
+
+@dataclass
+class CachedResult:
+    key: Tuple[str, ...]
+    stored_at: float
+    cvs: List[CV]
+
+
+class ResultCache:
+    def __init__(
+        self,
+        fresh_for: float = DEFAULT_RESULT_FRESH_FOR,
+        stale_for: float = DEFAULT_RESULT_STALE_FOR,
+        max_entries: int = DEFAULT_RESULT_MAX_ENTRIES,
+        directory: Optional[str] = DEFAULT_RESULT_CACHE_DIR,
+        schedule_refresh: Optional[RefreshScheduler] = None,
+    ) -> None:
+        """Cache of top K answers keyed by query, e.g. the tuple of
+        site, position, city and experience. Answers younger than
+        `fresh_for` seconds are served as is. For `stale_for` seconds
+        more they are still served right away, but the query is run
+        again in the background. At most `max_entries` answers are kept
+        in memory, least recently used ones are dropped first. With a
+        `directory`, answers are also saved there and outlive restarts;
+        it keeps at most `max_entries` answers too, oldest out first.
+        Background refreshes go through `schedule_refresh` when given,
+        so they can share the cap on running scrapes; otherwise each
+        one is an asyncio task."""
+        self.fresh_for = fresh_for
+        self.stale_for = stale_for
+        self.max_entries = max_entries
+        self.directory = directory
+        self.schedule_refresh = schedule_refresh
+        self._entries: "OrderedDict[Tuple[str, ...], CachedResult]" = (
+            OrderedDict()
+        )
+        # Keys with a refresh scheduled or running, one per key
+        self._refreshing: Set[Tuple[str, ...]] = set()
+        # Keeps refresh tasks from being collected
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._prune_disk()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _path(self, key: Tuple[str, ...]) -> str:
+        digest = hashlib.sha1(
+            json.dumps(key, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _prune_disk(self) -> None:
+        """Deletes saved answers that are past their stale window, then
+        the oldest ones beyond `max_entries`."""
+        expired_before = time.time() - self.fresh_for - self.stale_for
+        saved = []
+        for file_name in os.listdir(self.directory):
+            path = os.path.join(self.directory, file_name)
+            try:
+                modified_at = os.path.getmtime(path)
+                if modified_at < expired_before:
+                    os.remove(path)
+                else:
+                    saved.append((modified_at, path))
+            except OSError:
+                pass
+        saved.sort(reverse=True)
+        for _, path in saved[self.max_entries:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _read_disk(self, key: Tuple[str, ...]) -> Optional[CachedResult]:
+        try:
+            with open(self._path(key), encoding="utf-8") as result_file:
+                stored = json.load(result_file)
+            return CachedResult(
+                key=key,
+                stored_at=stored["stored_at"],
+                cvs=[CV(**cv) for cv in stored["cvs"]],
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_disk(self, entry: CachedResult) -> None:
+        path = self._path(entry.key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as result_file:
+                json.dump(
+                    {
+                        "stored_at": entry.stored_at,
+                        "cvs": [asdict(cv) for cv in entry.cvs],
+                    },
+                    result_file,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not save a cached result: %s", e)
+
+    def _remove(self, key: Tuple[str, ...]) -> None:
+        self._entries.pop(key, None)
+        if self.directory:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get(self, key: Tuple[str, ...]) -> Optional[CachedResult]:
+        """Returns the answer stored for a query unless it is past its
+        stale window, and marks it recently used."""
+        entry = self._entries.get(key)
+        if entry is None and self.directory:
+            entry = self._read_disk(key)
+        if entry is None:
+            return None
+        if time.time() - entry.stored_at >= self.fresh_for + self.stale_for:
+            self._remove(key)
+            return None
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._evict()
+        return entry
+
+    def put(self, key: Tuple[str, ...], cvs: List[CV]) -> None:
+        """Stores the answer to a query. Empty answers are not stored,
+        as scrapers also return them when a site fails."""
+        if not cvs:
+            return
+        entry = CachedResult(key=key, stored_at=time.time(), cvs=list(cvs))
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._evict()
+        if self.directory:
+            self._write_disk(entry)
+            self._prune_disk()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def is_fresh(self, entry: CachedResult) -> bool:
+        return time.time() - entry.stored_at < self.fresh_for
+
+    def _refresh(
+        self,
+        key: Tuple[str, ...],
+        search: Callable[[], Awaitable[List[CV]]],
+    ) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh() -> None:
+            try:
+                self.put(key, await search())
+            except Exception as e:
+                logger.warning("Could not refresh a cached result: %s", e)
+            finally:
+                self._refreshing.discard(key)
+
+        self._refreshing.add(key)
+        if self.schedule_refresh is not None:
+            if not self.schedule_refresh(key, refresh):
+                self._refreshing.discard(key)
+            return
+        task = asyncio.create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def fetch(
+        self,
+        key: Tuple[str, ...],
+        search: Callable[[], Awaitable[List[CV]]],
+    ) -> List[CV]:
+        """Returns the answer to a query from the cache or by awaiting
+        `search()`. Stale answers are returned at once and refreshed
+        with `search()` in a background task."""
+        entry = self.get(key)
+        if entry is not None and self.is_fresh(entry):
+            CACHE_REQUESTS.inc(cache="results", result="fresh")
+            return list(entry.cvs)
+        if entry is not None:
+            CACHE_REQUESTS.inc(cache="results", result="stale")
+            self._refresh(key, search)
+            return list(entry.cvs)
+        CACHE_REQUESTS.inc(cache="results", result="miss")
+        cvs = await search()
+        self.put(key, cvs)
+        return cvs
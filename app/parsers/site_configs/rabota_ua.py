@@ -1,3 +1,5 @@
+from app.parsers.pagination import PaginationBudget
+
 RABOTA_UA_BASE_URL = "https://employer-api.rabota.ua/"
 RABOTA_UA_RESUMES_ENDPOINT = "cvdb/resumes"
 RABOTA_UA_CITY_LIST_ENDPOINT = "values/citylist"
@@ -12,3 +14,6 @@ RABOTA_UA_EXPERIENCE_DICT = {
     "Від 5 до 10 років": "4",
     "Більше 10 років": "5",
 }
+
+# The API returns 20 resumes per page; rank the best 100 matches
+RABOTA_UA_PAGINATION_BUDGET = PaginationBudget(max_candidates=100)
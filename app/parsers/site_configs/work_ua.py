@@ -1,5 +1,7 @@
 from urllib.parse import quote, urljoin
 
+from app.parsers.http_cache import CachePolicy
+from app.parsers.pagination import PaginationBudget
 from app.parsers.parse_utils import SiteConfig
 
 WORK_UA_BASE_URL = "https://www.work.ua"
@@ -76,3 +78,13 @@ WORK_UA_CONFIG = SiteConfig(
         "paginator": "ul.pagination.hidden-xs",
     },
 )
+
+# Resume pages change rarely, search result pages change often
+WORK_UA_CACHE_POLICIES = [
+    (r"/resumes/\d+/?$", CachePolicy(ttl=24 * 60 * 60)),
+    (r"/resumes-", CachePolicy(ttl=10 * 60)),
+]
+
+# Uncapped: the rating does not follow page order, so any page may hold
+# a top 5 candidate. Pass a budget with max_pages to trade that for speed
+WORK_UA_PAGINATION_BUDGET = PaginationBudget()
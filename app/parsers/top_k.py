@@ -0,0 +1,59 @@
+import heapq
+import itertools
+from typing import Iterable, List, Optional
+
+from app.parsers.parse_utils import CV
+
+DEFAULT_TOP_K = 5
+
+
+class TopKSelector:
+    def __init__(self, k: int = DEFAULT_TOP_K) -> None:
+        """Keeps the `k` best rated CVs seen so far in a bounded min-heap.
+        On equal ratings the CV pushed first wins, as with a stable sort."""
+        if k < 1:
+            raise ValueError("k must be a positive integer.")
+        self.k = k
+        self._heap: list = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def threshold(self) -> Optional[int]:
+        """Returns the K-th best rating once K CVs are held, else None.
+        A candidate that cannot rate above it will not enter the result."""
+        if len(self._heap) < self.k:
+            return None
+        return self._heap[0][0]
+
+    def can_enter(self, rating: int) -> bool:
+        """Checks whether a CV with the given rating would be kept."""
+        threshold = self.threshold
+        return threshold is None or rating > threshold
+
+    def push(self, cv: CV) -> bool:
+        """Offers a rated CV. Returns True if it was kept."""
+        entry = (cv.rating, -next(self._counter), cv)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def extend(self, cvs: Iterable[CV]) -> None:
+        """Offers several rated CVs."""
+        for cv in cvs:
+            self.push(cv)
+
+    def results(self) -> List[CV]:
+        """Returns the kept CVs ordered by rating, best first."""
+        return [
+            entry[2]
+            for entry in sorted(
+                self._heap, key=lambda entry: entry[:2], reverse=True
+            )
+        ]
@@ -0,0 +1,45 @@
+import os
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.types import FSInputFile, Message
+
+from app.parsers.profiling import RunProfiler
+from app.telegram_bot.utils.outbound import outbound
+
+# Users whose next query is profiled
+armed_users = set()
+
+
+async def arm_profiling(message: Message, bot: Bot) -> None:
+    """Admin-only /profile: profiles the admin's next query."""
+    if str(message.from_user.id) != os.getenv("ADMIN_ID"):
+        return
+    armed_users.add(message.from_user.id)
+    await outbound.send(
+        bot,
+        message.from_user.id,
+        "🔬 Наступний пошук буде запрофільовано, звіт прийде файлом.",
+    )
+
+
+def take_profiler(user_id: int, name: str) -> Optional[RunProfiler]:
+    """Returns a profiler for the user's query if /profile armed one."""
+    if user_id not in armed_users:
+        return None
+    armed_users.discard(user_id)
+    return RunProfiler(name)
+
+
+async def send_profile_report(
+    bot: Bot, user_id: int, profiler: Optional[RunProfiler]
+) -> None:
+    """Sends the report of a profiled query to the user."""
+    if profiler is None or profiler.report_path is None:
+        return
+    await outbound.send_document(
+        bot,
+        user_id,
+        FSInputFile(profiler.report_path),
+        caption="🔬 Профіль запиту",
+    )
@@ -1,19 +1,45 @@
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from html import escape
 
 from aiogram import Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
 from app.parsers.main import get_rabota_ua_top_5_cvs
+from app.parsers.metrics import (
+    QUERIES_IN_PROGRESS,
+    QUERY_SECONDS,
+    STAGE_SECONDS,
+    site_label,
+)
+from app.parsers.site_configs.rabota_ua import RABOTA_UA_BASE_URL
+from app.telegram_bot.handlers.profile_handler import (
+    send_profile_report,
+    take_profiler,
+)
+from app.telegram_bot.keyboards.city_suggestions_kb import (
+    city_suggestions_kb
+)
 from app.telegram_bot.keyboards.main_kb import main_kb
 from app.telegram_bot.keyboards.rabota_ua_experience_generator_kb import (
     experience_kb
 )
 from app.telegram_bot.state.rabota_ua_state import RabotaUaState
+from app.telegram_bot.utils.city_suggestions import (
+    city_from_callback,
+    resolve_city,
+)
+from app.telegram_bot.utils.job_queue import Job, enqueue_scrape
+from app.telegram_bot.utils.outbound import outbound
+from app.telegram_bot.utils.scrape_broker import scrape_broker
+from app.telegram_bot.utils.scrape_state import (
+    shared_http_engine,
+    shared_result_cache,
+)
+from app.telegram_bot.utils.single_flight import query_key, scrape_flights
 
 
-executor = ThreadPoolExecutor()
+SITE = site_label(RABOTA_UA_BASE_URL)
 
 
 async def start_rabota_ua_parser(
@@ -21,8 +47,9 @@ async def start_rabota_ua_parser(
         state: FSMContext, bot: Bot
 ) -> None:
     await state.clear()
-    await bot.send_message(message.from_user.id, "Давай почнемо💫")
-    await bot.send_message(
+    await outbound.send(bot, message.from_user.id, "Давай почнемо💫")
+    await outbound.send(
+        bot,
         message.from_user.id,
         (
             "✍️ Напишіть наички за якими ви шукаєте кандидатів\n\n"
@@ -40,7 +67,8 @@ async def rabota_register_cvs_position(
     message: Message, state: FSMContext, bot: Bot
 ) -> None:
     await state.update_data(position=message.text)
-    await bot.send_message(
+    await outbound.send(
+        bot,
         message.from_user.id,
         (
             "✍️ Напишіть місто в якому шукати кандидатів\n\n"
@@ -57,9 +85,45 @@ async def rabota_register_cvs_position(
 async def rabota_register_cvs_city(
     message: Message, state: FSMContext, bot: Bot
 ) -> None:
-    await state.update_data(city=message.text)
-    await bot.send_message(
-        message.from_user.id,
+    city, suggestions = await resolve_city(message.text)
+    if city is None:
+        if suggestions:
+            await outbound.send(
+                bot,
+                message.from_user.id,
+                "🤔 Не знайшов такого міста. Можливо, ви мали на увазі:",
+                reply_markup=await city_suggestions_kb(suggestions),
+            )
+        else:
+            await outbound.send(
+                bot,
+                message.from_user.id,
+                "🤔 Не знайшов такого міста. Перевірте назву і напишіть"
+                " місто ще раз.",
+            )
+        return
+    await rabota_ask_cvs_experience(message.from_user.id, city, state, bot)
+
+
+async def rabota_choose_cvs_city(
+    callback_query: CallbackQuery, state: FSMContext, bot: Bot
+) -> None:
+    await callback_query.answer()
+    city = city_from_callback(callback_query.data)
+    if city is None:
+        return
+    await rabota_ask_cvs_experience(
+        callback_query.from_user.id, city, state, bot
+    )
+
+
+async def rabota_ask_cvs_experience(
+    user_id: int, city: str, state: FSMContext, bot: Bot
+) -> None:
+    await state.update_data(city=city)
+    await outbound.send(
+        bot,
+        user_id,
         "Виберіть досвід роботи кандидата:",
         reply_markup=await experience_kb(),
     )
@@ -79,14 +143,16 @@ async def rabota_register_cvs_experience(
     experience = user_data.get("experience")
 
     if not position or not city or not experience:
-        await bot.send_message(
+        await outbound.send(
+            bot,
             callback_query.from_user.id,
             "Будь ласка, переконайтесь, що ви ввели всі необхідні дані"
             " (посада, місто, досвід роботи).",
         )
         return
 
-    await bot.send_message(
+    await outbound.send(
+        bot,
         callback_query.from_user.id,
         (
             f"Ви вибрали:\n\n"
@@ -97,30 +163,86 @@ async def rabota_register_cvs_experience(
         ),
     )
 
-    loop = asyncio.get_running_loop()
-    top_5_cv = await loop.run_in_executor(
-        None,
-        get_rabota_ua_top_5_cvs,
-        position,  # Передача именованных аргументов
-        city,
-        experience,
+    user_id = callback_query.from_user.id
+    await enqueue_scrape(
+        bot,
+        Job(
+            user_id=user_id,
+            key=query_key(SITE, position, city, experience),
+            run=partial(
+                rabota_send_top_5_cvs,
+                bot,
+                user_id,
+                position,
+                city,
+                experience,
+            ),
+            site=SITE,
+        ),
     )
+    await state.clear()
 
-    if not top_5_cv:
-        await bot.send_message(
-            callback_query.from_user.id,
-            "Не вдалося знайти кандидатів за заданими параметрами. "
-            "Спробуйте інші параметри.",
-            reply_markup=main_kb,
-        )
-    else:
-        for cv in top_5_cv:
-            message_text = (
-                f"👤 Ім'я: {cv.name}\n"
-                f"📅 Вік: {cv.age}\n"
-                f"📍 Місто: {cv.location or 'Unknown'}\n"
-                f"🔗 Ссилка на резюме: {cv.url}"
+
+async def rabota_send_top_5_cvs(
+    bot: Bot,
+    user_id: int,
+    position: str,
+    city: str,
+    experience: str,
+) -> None:
+    """Scrape job of a query: finds the top 5 CVs and sends them.
+    A /profile request is used up here, when the job runs, so a job
+    dropped as a duplicate does not take it."""
+    profiler = take_profiler(user_id, "rabota_ua")
+    with QUERIES_IN_PROGRESS.track(site=SITE), QUERY_SECONDS.time(site=SITE):
+        broker = scrape_broker()
+        if broker is not None and profiler is None:
+            # Scraped by a worker process, see SCRAPE_BROKER
+            search = partial(
+                broker.request, "rabota_ua", position, city, experience
+            )
+        else:
+            search = partial(
+                get_rabota_ua_top_5_cvs,
+                position,
+                city,
+                experience,
+                profiler=profiler,
+                http_engine=shared_http_engine(),
+            )
+        if profiler is not None:
+            # A profiled query gets a run of its own, in this process
+            top_5_cv = await search()
+        else:
+            # Recent answers are reused; equal queries from several
+            # users share one scrape
+            key = query_key(SITE, position, city, experience)
+            top_5_cv = await shared_result_cache().fetch(
+                key, partial(scrape_flights.run, key, search, SITE)
             )
-            await bot.send_message(callback_query.from_user.id, message_text)
 
-    await state.clear()
+        with STAGE_SECONDS.time(site=SITE, stage="telegram_send"):
+            if not top_5_cv:
+                await outbound.send(
+                    bot,
+                    user_id,
+                    "Не вдалося знайти кандидатів за заданими параметрами. "
+                    "Спробуйте інші параметри.",
+                    reply_markup=main_kb,
+                )
+            else:
+                # One message for the whole top 5 while it fits; CV
+                # fields are escaped for the bot's HTML parse mode
+                await outbound.send_joined(
+                    bot,
+                    user_id,
+                    [
+                        f"👤 Ім'я: {escape(cv.name)}\n"
+                        f"📅 Вік: {cv.age}\n"
+                        f"📍 Місто: {escape(cv.location or 'Unknown')}\n"
+                        f"🔗 Ссилка на резюме: {escape(str(cv.url))}"
+                        for cv in top_5_cv
+                    ],
+                )
+
+    await send_profile_report(bot, user_id, profiler)
@@ -2,10 +2,12 @@ from aiogram import Bot
 from aiogram.types import Message
 
 from app.telegram_bot.keyboards.main_kb import main_kb
+from app.telegram_bot.utils.outbound import outbound
 
 
 async def get_start(message: Message, bot: Bot) -> None:
-    await bot.send_message(
+    await outbound.send(
+        bot,
         message.from_user.id,
         "Вітаю👋\n\n⚠️ Бот розуміє тільки українську мову\n\n"
         "Оберіть де шукати кандидатів...",
@@ -1,13 +1,48 @@
+from functools import partial
+from html import escape
+
 from aiogram import Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
 from app.parsers.main import get_work_ua_top_5_cvs
+from app.parsers.metrics import (
+    QUERIES_IN_PROGRESS,
+    QUERY_SECONDS,
+    STAGE_SECONDS,
+    site_label,
+)
+from app.parsers.site_configs.work_ua import WORK_UA_BASE_URL
+from app.telegram_bot.handlers.profile_handler import (
+    send_profile_report,
+    take_profiler,
+)
+from app.telegram_bot.keyboards.city_suggestions_kb import (
+    city_suggestions_kb
+)
 from app.telegram_bot.keyboards.main_kb import main_kb
 from app.telegram_bot.keyboards.work_ua_experience_generator_kb import (
     experience_kb
 )
 from app.telegram_bot.state.work_ua_state import WorkUaState
+from app.telegram_bot.utils.city_suggestions import (
+    city_from_callback,
+    resolve_city,
+)
+from app.telegram_bot.utils.job_queue import Job, enqueue_scrape
+from app.telegram_bot.utils.outbound import outbound
+from app.telegram_bot.utils.scrape_broker import scrape_broker
+from app.telegram_bot.utils.scrape_state import (
+    shared_cv_store,
+    shared_http_engine,
+    shared_parse_executor,
+    shared_result_cache,
+    shared_work_ua_http_cache,
+)
+from app.telegram_bot.utils.single_flight import query_key, scrape_flights
+
+
+SITE = site_label(WORK_UA_BASE_URL)
 
 
 async def start_work_ua_parser(
@@ -15,8 +50,9 @@ async def start_work_ua_parser(
         state: FSMContext, bot: Bot
 ) -> None:
     await state.clear()
-    await bot.send_message(message.from_user.id, "Давай почнемо💫")
-    await bot.send_message(
+    await outbound.send(bot, message.from_user.id, "Давай почнемо💫")
+    await outbound.send(
+        bot,
         message.from_user.id,
         (
             "✍️ Напишіть на яку посаду ви шукаєте кандидатів\n\n"
@@ -34,7 +70,8 @@ async def work_register_cvs_position(
     message: Message, state: FSMContext, bot: Bot
 ) -> None:
     await state.update_data(position=message.text)
-    await bot.send_message(
+    await outbound.send(
+        bot,
         message.from_user.id,
         (
             "✍️ Напишіть місто в якому шукати кандидатів\n\n"
@@ -52,9 +89,47 @@ async def work_register_cvs_city(
         message: Message,
         state: FSMContext, bot: Bot
 ) -> None:
-    await state.update_data(city=message.text)
-    await bot.send_message(
-        message.from_user.id,
+    # Checked against rabota.ua's city list, as work.ua has none; a city
+    # missing there cannot be searched on work.ua through the bot
+    city, suggestions = await resolve_city(message.text)
+    if city is None:
+        if suggestions:
+            await outbound.send(
+                bot,
+                message.from_user.id,
+                "🤔 Не знайшов такого міста. Можливо, ви мали на увазі:",
+                reply_markup=await city_suggestions_kb(suggestions),
+            )
+        else:
+            await outbound.send(
+                bot,
+                message.from_user.id,
+                "🤔 Не знайшов такого міста. Перевірте назву і напишіть"
+                " місто ще раз.",
+            )
+        return
+    await work_ask_cvs_experience(message.from_user.id, city, state, bot)
+
+
+async def work_choose_cvs_city(
+    callback_query: CallbackQuery, state: FSMContext, bot: Bot
+) -> None:
+    await callback_query.answer()
+    city = city_from_callback(callback_query.data)
+    if city is None:
+        return
+    await work_ask_cvs_experience(
+        callback_query.from_user.id, city, state, bot
+    )
+
+
+async def work_ask_cvs_experience(
+    user_id: int, city: str, state: FSMContext, bot: Bot
+) -> None:
+    await state.update_data(city=city)
+    await outbound.send(
+        bot,
+        user_id,
         "Виберіть досвід роботи кандидата:",
         reply_markup=await experience_kb(),
     )
@@ -75,14 +150,16 @@ async def work_register_cvs_experience(
     experience = user_data.get("experience")
 
     if not position or not city or not experience:
-        await bot.send_message(
+        await outbound.send(
+            bot,
             callback_query.from_user.id,
             "Будь ласка, переконайтесь, що ви ввели всі необхідні дані"
             " (посада, місто, досвід роботи).",
         )
         return
 
-    await bot.send_message(
+    await outbound.send(
+        bot,
         callback_query.from_user.id,
         (
             f"Ви вибрали:\n\n"
@@ -93,27 +170,89 @@ async def work_register_cvs_experience(
         ),
     )
 
-    top_5_cv = await get_work_ua_top_5_cvs(
-        position=position, location=city, experience=experience
+    user_id = callback_query.from_user.id
+    await enqueue_scrape(
+        bot,
+        Job(
+            user_id=user_id,
+            key=query_key(SITE, position, city, experience),
+            run=partial(
+                work_send_top_5_cvs,
+                bot,
+                user_id,
+                position,
+                city,
+                experience,
+            ),
+            site=SITE,
+        ),
     )
+    await state.clear()
 
-    if not top_5_cv:
-        await bot.send_message(
-            callback_query.from_user.id,
-            "Не вдалося знайти кандидатів за заданими параметрами."
-            " Спробуйте інші параметри.",
-            reply_markup=main_kb,
-        )
-    else:
-        for cv in top_5_cv:
-            await bot.send_message(
-                callback_query.from_user.id,
-                (
-                    f"👤 Ім'я: {cv.name}\n"
-                    f"📅 Вік: {cv.age}\n"
-                    f"💼 Навички: {', '.join(cv.skills)}\n"
-                    f"🔗 Ссилка на резюме: {cv.url}"
-                ),
-                reply_markup=main_kb,
+
+async def work_send_top_5_cvs(
+    bot: Bot,
+    user_id: int,
+    position: str,
+    city: str,
+    experience: str,
+) -> None:
+    """Scrape job of a query: finds the top 5 CVs and sends them.
+    A /profile request is used up here, when the job runs, so a job
+    dropped as a duplicate does not take it."""
+    profiler = take_profiler(user_id, "work_ua")
+    with QUERIES_IN_PROGRESS.track(site=SITE), QUERY_SECONDS.time(site=SITE):
+        broker = scrape_broker()
+        if broker is not None and profiler is None:
+            # Scraped by a worker process, see SCRAPE_BROKER
+            search = partial(
+                broker.request, "work_ua", position, city, experience
             )
-    await state.clear()
+        else:
+            search = partial(
+                get_work_ua_top_5_cvs,
+                position=position,
+                location=city,
+                experience=experience,
+                http_engine=shared_http_engine(),
+                parse_executor=shared_parse_executor(),
+                http_cache=shared_work_ua_http_cache(),
+                cv_store=shared_cv_store(),
+                profiler=profiler,
+            )
+        if profiler is not None:
+            # A profiled query gets a run of its own, in this process
+            top_5_cv = await search()
+        else:
+            # Recent answers are reused; equal queries from several
+            # users share one scrape
+            key = query_key(SITE, position, city, experience)
+            top_5_cv = await shared_result_cache().fetch(
+                key, partial(scrape_flights.run, key, search, SITE)
+            )
+
+        with STAGE_SECONDS.time(site=SITE, stage="telegram_send"):
+            if not top_5_cv:
+                await outbound.send(
+                    bot,
+                    user_id,
+                    "Не вдалося знайти кандидатів за заданими параметрами."
+                    " Спробуйте інші параметри.",
+                    reply_markup=main_kb,
+                )
+            else:
+                # One message for the whole top 5 while it fits; CV
+                # fields are escaped for the bot's HTML parse mode
+                await outbound.send_joined(
+                    bot,
+                    user_id,
+                    [
+                        f"👤 Ім'я: {escape(cv.name)}\n"
+                        f"📅 Вік: {cv.age}\n"
+                        f"💼 Навички: {escape(', '.join(cv.skills))}\n"
+                        f"🔗 Ссилка на резюме: {escape(str(cv.url))}"
+                        for cv in top_5_cv
+                    ],
+                    reply_markup=main_kb,
+                )
+    await send_profile_report(bot, user_id, profiler)
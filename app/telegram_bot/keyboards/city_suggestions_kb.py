@@ -0,0 +1,24 @@
+from typing import List, Tuple
+
+from aiogram.types.inline_keyboard_markup import InlineKeyboardMarkup
+
+from app.telegram_bot.utils.city_suggestions import CITY_CALLBACK_PREFIX
+from app.telegram_bot.utils.inline_keyboard_builder import (
+    InlineKeyboardBuilder
+)
+
+
+async def city_suggestions_kb(
+    suggestions: List[Tuple[int, str]]
+) -> InlineKeyboardMarkup:
+    kb = InlineKeyboardBuilder()
+
+    for city_id, city_name in suggestions:
+        kb.button(
+            text=f"{city_name}",
+            callback_data=f"{CITY_CALLBACK_PREFIX}{city_id}",
+        )
+
+        kb.adjust(1)
+
+    return kb.as_markup()
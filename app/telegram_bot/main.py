@@ -8,20 +8,32 @@ from aiogram import Dispatcher, Bot, F
 from aiogram.client.default import DefaultBotProperties
 from aiogram.filters import Command
 
+from app.parsers.metrics import DEFAULT_METRICS_PORT, start_metrics_server
+from app.parsers.site_configs.rabota_ua import RABOTA_UA_EXPERIENCE_DICT
+from app.parsers.site_configs.work_ua import WORK_UA_EXPERIENCE_CATEGORIES
+from app.telegram_bot.handlers.profile_handler import arm_profiling
 from app.telegram_bot.handlers.rabota_ua_handler import (
     start_rabota_ua_parser,
     rabota_register_cvs_position,
     rabota_register_cvs_city,
+    rabota_choose_cvs_city,
     rabota_register_cvs_experience,
 )
 from app.telegram_bot.handlers.work_ua_handler import (
     start_work_ua_parser,
     work_register_cvs_position,
     work_register_cvs_city,
+    work_choose_cvs_city,
     work_register_cvs_experience,
 )
 
 from app.telegram_bot.state.rabota_ua_state import RabotaUaState
+from app.telegram_bot.utils.job_queue import scrape_jobs
+from app.telegram_bot.utils.outbound import outbound
+from app.telegram_bot.utils.scrape_broker import (
+    close_scrape_broker,
+    start_scrape_broker,
+)
 from handlers.start import get_start
 from utils.commands import set_commands
 from state.work_ua_state import WorkUaState
@@ -32,47 +44,86 @@ load_dotenv()
 ADMIN_ID = os.environ["ADMIN_ID"]
 BOT_TOKEN = os.environ["TELEGRAM_BOT_TOKEN"]
 
-bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-dp = Dispatcher()
-
 
 # Send a message to admin when bot started
 async def start_bot(bot: Bot) -> None:
-    await bot.send_message(ADMIN_ID, text="Bot started!")
-
-
-# Start message
-dp.startup.register(start_bot)
-dp.message.register(get_start, Command(commands="start"))
-
-# Get work.ua top 5 CV
-dp.message.register(start_work_ua_parser, F.text == "🤓 work.ua")
-dp.message.register(work_register_cvs_position, WorkUaState.position)
-dp.message.register(work_register_cvs_city, WorkUaState.city)
-dp.callback_query.register(
-    work_register_cvs_experience,
-    WorkUaState.experience
-)
-
-# Get rabota.ua top 5 CV
-dp.message.register(start_rabota_ua_parser, F.text == "🤓 rabota.ua")
-dp.message.register(rabota_register_cvs_position, RabotaUaState.position)
-dp.message.register(rabota_register_cvs_city, RabotaUaState.city)
-dp.callback_query.register(
-    rabota_register_cvs_experience,
-    RabotaUaState.experience
-)
+    await outbound.send(bot, ADMIN_ID, "Bot started!")
+
+
+def create_dispatcher() -> Dispatcher:
+    """Builds the dispatcher with every handler registered. Called by
+    main() rather than on import: worker processes spawned in broker
+    mode re-import this module and must not build a bot of their own."""
+    dp = Dispatcher()
+
+    # Start message
+    dp.startup.register(start_bot)
+    dp.message.register(get_start, Command(commands="start"))
+
+    # Admin only: profile the next query
+    dp.message.register(arm_profiling, Command(commands="profile"))
+
+    # Get work.ua top 5 CV
+    dp.message.register(start_work_ua_parser, F.text == "🤓 work.ua")
+    dp.message.register(work_register_cvs_position, WorkUaState.position)
+    dp.message.register(work_register_cvs_city, WorkUaState.city)
+    dp.callback_query.register(work_choose_cvs_city, WorkUaState.city)
+    # Only the experience buttons; an old city suggestion pressed now
+    # must not be saved as the experience
+    dp.callback_query.register(
+        work_register_cvs_experience,
+        WorkUaState.experience,
+        F.data.in_(WORK_UA_EXPERIENCE_CATEGORIES),
+    )
+
+    # Get rabota.ua top 5 CV
+    dp.message.register(start_rabota_ua_parser, F.text == "🤓 rabota.ua")
+    dp.message.register(
+        rabota_register_cvs_position, RabotaUaState.position
+    )
+    dp.message.register(rabota_register_cvs_city, RabotaUaState.city)
+    dp.callback_query.register(rabota_choose_cvs_city, RabotaUaState.city)
+    dp.callback_query.register(
+        rabota_register_cvs_experience,
+        RabotaUaState.experience,
+        F.data.in_(RABOTA_UA_EXPERIENCE_DICT),
+    )
+    return dp
 
 
 async def main() -> None:
+    bot = Bot(
+        token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML")
+    )
+    dp = create_dispatcher()
+
     # Menu commands
     await set_commands(bot)
 
     logging.basicConfig(level=logging.INFO)
 
+    # Prometheus-style metrics on http://METRICS_HOST:METRICS_PORT/metrics
+    # when METRICS_PORT is set; the bot runs without them if the port
+    # cannot be bound
+    metrics_runner = None
+    if DEFAULT_METRICS_PORT:
+        try:
+            metrics_runner = await start_metrics_server()
+        except OSError as e:
+            logging.warning("Metrics are off, could not serve them: %s", e)
+
+    # Handlers queue scrapes; SCRAPE_WORKERS of them run at once
+    scrape_jobs.start()
+    # With SCRAPE_BROKER set, worker processes do the scraping
+    await start_scrape_broker()
+
     try:
         await dp.start_polling(bot, skip_update=True)
     finally:
+        await scrape_jobs.stop()
+        await close_scrape_broker()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
         await bot.session.close()
 
 
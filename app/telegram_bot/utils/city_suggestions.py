@@ -0,0 +1,64 @@
+import logging
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from app.parsers.city_index import shared_city_index
+from app.parsers.generic_api_scraper import AsyncGenericApiScraper
+from app.parsers.site_configs.rabota_ua import (
+    RABOTA_UA_BASE_URL,
+    RABOTA_UA_CITY_LIST_ENDPOINT,
+    RABOTA_UA_EXPERIENCE_DICT,
+    RABOTA_UA_HEADERS,
+    RABOTA_UA_RESUMES_ENDPOINT,
+)
+from app.telegram_bot.utils.scrape_state import shared_http_engine
+
+CITY_CALLBACK_PREFIX = "city:"
+
+logger = logging.getLogger(__name__)
+
+# Both sites' city steps check names against rabota.ua's city list;
+# work.ua has no city list API of its own
+city_index = shared_city_index(
+    RABOTA_UA_BASE_URL + RABOTA_UA_CITY_LIST_ENDPOINT
+)
+
+
+@lru_cache(maxsize=None)
+def city_list_client() -> AsyncGenericApiScraper:
+    """Downloads the rabota.ua city list when the shared index needs it,
+    over the bot's shared HTTP engine; created on first use."""
+    return AsyncGenericApiScraper(
+        base_url=RABOTA_UA_BASE_URL,
+        resumes_endpoint=RABOTA_UA_RESUMES_ENDPOINT,
+        city_list_endpoint=RABOTA_UA_CITY_LIST_ENDPOINT,
+        headers=RABOTA_UA_HEADERS,
+        experience_categories=RABOTA_UA_EXPERIENCE_DICT,
+        http_engine=shared_http_engine(),
+    )
+
+
+async def resolve_city(
+    text: str,
+) -> Tuple[Optional[str], List[Tuple[int, str]]]:
+    """Returns the Ukrainian name of the city the user typed, or
+    (None, suggestions) when the name does not resolve. If the city
+    list cannot be loaded, the text is accepted as typed."""
+    try:
+        city_id = await city_index.lookup_async(
+            text, city_list_client().get_city_list
+        )
+    except Exception as e:
+        logger.warning("Could not load the city list: %s", e)
+        return text, []
+    if city_id is not None:
+        return city_index.city_name(city_id), []
+    return None, city_index.suggest(text)
+
+
+def city_from_callback(data: str) -> Optional[str]:
+    """The city name behind a suggestion button, if it is one."""
+    if not data or not data.startswith(CITY_CALLBACK_PREFIX):
+        return None
+    city_id = data[len(CITY_CALLBACK_PREFIX):]
+    return city_index.city_name(int(city_id)) if city_id.isdigit() else None
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Awaitable, Callable, Deque, Hashable, List, Optional, Set
+
+from aiogram import Bot
+
+from app.parsers.metrics import JOB_WAIT_SECONDS, JOBS_QUEUED
+from app.telegram_bot.keyboards.main_kb import main_kb
+from app.telegram_bot.utils.outbound import outbound
+
+# Scrapes run at the same time, across all users
+DEFAULT_SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "4"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class Job:
+    user_id: int
+    # Equal keys from one user mark a duplicate job
+    key: Hashable
+    run: Callable[[], Awaitable[None]]
+    site: str = ""
+    # Called with the exception when `run` fails
+    on_error: Optional[Callable[[Exception], Awaitable[None]]] = None
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class JobQueue:
+    def __init__(self, workers: int = DEFAULT_SCRAPE_WORKERS) -> None:
+        """Runs scrape jobs on a fixed pool of `workers` asyncio tasks,
+        which is also the cap on scrapes running at once. Users take
+        turns: each free worker picks the oldest job of the next user
+        in a round-robin over users with pending jobs, so one user's
+        burst of queries does not hold back everybody else's."""
+        if workers < 1:
+            raise ValueError("workers must be a positive integer.")
+        self.workers = workers
+        self._pending: "OrderedDict[int, Deque[Job]]" = OrderedDict()
+        self._running: Set[tuple] = set()
+        self._available: Optional[asyncio.Semaphore] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        """Jobs waiting for a worker."""
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    @property
+    def idle_workers(self) -> int:
+        return len(self._worker_tasks) - len(self._running)
+
+    def start(self) -> None:
+        """Starts the workers on the running event loop."""
+        if self._worker_tasks:
+            return
+        self._available = asyncio.Semaphore(len(self))
+        self._worker_tasks = [
+            asyncio.create_task(self._work()) for _ in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Cancels the workers and the jobs they are running."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def _is_duplicate(self, job: Job) -> bool:
+        if (job.user_id, job.key) in self._running:
+            return True
+        return any(
+            pending.key == job.key
+            for pending in self._pending.get(job.user_id, ())
+        )
+
+    def position(self, job: Job) -> int:
+        """How many pending jobs will be picked before `job`."""
+        jobs = self._pending.get(job.user_id, ())
+        if job not in jobs:
+            return 0
+        turn = list(jobs).index(job)
+        ahead = turn
+        before_user = True
+        for user_id, user_jobs in self._pending.items():
+            if user_id == job.user_id:
+                before_user = False
+                continue
+            ahead += min(len(user_jobs), turn + 1 if before_user else turn)
+        return ahead
+
+    def submit(self, job: Job) -> Optional[int]:
+        """Queues a job and returns how many pending jobs are ahead of
+        it, or None when the user already has an equal job queued or
+        running; the duplicate is then dropped."""
+        if self._is_duplicate(job):
+            return None
+        self._pending.setdefault(job.user_id, deque()).append(job)
+        JOBS_QUEUED.inc(site=job.site)
+        if self._available is not None:
+            self._available.release()
+        return self.position(job)
+
+    def _take(self) -> Job:
+        user_id, jobs = next(iter(self._pending.items()))
+        job = jobs.popleft()
+        if jobs:
+            self._pending.move_to_end(user_id)
+        else:
+            del self._pending[user_id]
+        return job
+
+    async def _work(self) -> None:
+        while True:
+            await self._available.acquire()
+            job = self._take()
+            JOBS_QUEUED.dec(site=job.site)
+            JOB_WAIT_SECONDS.observe(
+                time.perf_counter() - job.enqueued_at, site=job.site
+            )
+            running_key = (job.user_id, job.key)
+            self._running.add(running_key)
+            try:
+                await job.run()
+            except Exception as e:
+                logger.exception("Scrape job of user %s failed", job.user_id)
+                await self._report_failure(job, e)
+            finally:
+                self._running.discard(running_key)
+
+    @staticmethod
+    async def _report_failure(job: Job, error: Exception) -> None:
+        if job.on_error is None:
+            return
+        try:
+            await job.on_error(error)
+        except Exception:
+            logger.exception(
+                "Could not report the failed job of user %s", job.user_id
+            )
+
+
+# Shared by the work.ua and rabota.ua handlers
+scrape_jobs = JobQueue()
+
+
+async def tell_scrape_failed(
+    bot: Bot, user_id: int, error: Exception
+) -> None:
+    """Tells the user that their search failed."""
+    await outbound.send(
+        bot,
+        user_id,
+        "⚠️ Не вдалося виконати пошук. Спробуйте ще раз пізніше.",
+        reply_markup=main_kb,
+    )
+
+
+async def enqueue_scrape(
+    bot: Bot, job: Job, queue: JobQueue = scrape_jobs
+) -> None:
+    """Queues a scrape job and tells the user if it has to wait
+    or duplicates a search of theirs that is already queued.
+    Unless the job has its own `on_error`, the user is told when
+    it fails."""
+    if job.on_error is None:
+        job.on_error = partial(tell_scrape_failed, bot, job.user_id)
+    ahead = queue.submit(job)
+    if ahead is None:
+        text = "⏳ Цей пошук уже виконується, результати прийдуть сюди."
+    elif ahead >= queue.idle_workers:
+        text = f"⏳ Ваш запит у черзі. Запитів перед ним: {ahead}."
+    else:
+        return
+    await outbound.send(bot, job.user_id, text)
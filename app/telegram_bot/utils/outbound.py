@@ -0,0 +1,185 @@
+import asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Awaitable, Callable, Deque, Dict, List
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Message
+
+from app.parsers.metrics import TELEGRAM_FLOOD_WAITS
+from app.parsers.rate_limiter import TokenBucket
+
+# Telegram's documented limits: about 30 messages per second in total,
+# about one per second in a chat, 4096 characters per message
+GLOBAL_MESSAGE_RATE = 30.0
+CHAT_MESSAGE_RATE = 1.0
+CHAT_MESSAGE_BURST = 3
+MESSAGE_LIMIT = 4096
+# Chats whose rate limit state is remembered after their last send
+MAX_TRACKED_CHATS = 10000
+
+
+def _cut_position(text: str, limit: int) -> int:
+    """Where to cut HTML text longer than `limit`: at the last newline
+    or space that fits, or else before an entity such as `&amp;` that
+    a cut at `limit` would split; Telegram rejects broken entities."""
+    for separator in ("\n", " "):
+        cut = text.rfind(separator, 0, limit + 1)
+        if cut > 0:
+            return cut
+    entity_start = text.rfind("&", 0, limit)
+    if entity_start > 0 and ";" not in text[entity_start:limit]:
+        return entity_start
+    return limit
+
+
+def join_messages(
+    parts: List[str], limit: int = MESSAGE_LIMIT, separator: str = "\n\n"
+) -> List[str]:
+    """Packs message parts, e.g. one per CV, into as few messages
+    as fit in `limit` characters. A part that alone is too long is
+    cut into pieces at line breaks or spaces where it can be, and
+    never inside an HTML entity."""
+    messages: List[str] = []
+    current = ""
+    for part in parts:
+        while len(part) > limit:
+            if current:
+                messages.append(current)
+                current = ""
+            cut = _cut_position(part, limit)
+            messages.append(part[:cut])
+            part = part[cut:].lstrip()
+        if current and len(current) + len(separator) + len(part) <= limit:
+            current += separator + part
+        else:
+            if current:
+                messages.append(current)
+            current = part
+    if current:
+        messages.append(current)
+    return messages
+
+
+@dataclass
+class OutboundMessage:
+    # Sends the message; called again when Telegram asks to retry
+    send: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+
+
+class OutboundScheduler:
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_MESSAGE_RATE,
+        chat_rate: float = CHAT_MESSAGE_RATE,
+        chat_burst: int = CHAT_MESSAGE_BURST,
+        max_retries: int = 3,
+    ) -> None:
+        """Sends bot messages under a global token bucket and one per
+        chat. Each chat has its own queue, drained in order by its own
+        task, so a RetryAfter from Telegram only holds back the chat
+        it came for; the message is sent again once it has passed.
+        Every message the bot sends should go through it, or the global
+        bucket does not see all of the bot's traffic."""
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, max(1, int(global_rate)))
+        self._chats: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._queues: Dict[int, Deque[OutboundMessage]] = {}
+        self._senders: Dict[int, asyncio.Task] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chats[chat_id] = bucket
+            while len(self._chats) > MAX_TRACKED_CHATS:
+                self._chats.popitem(last=False)
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def call(
+        self, chat_id: int, send: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Queues any bot call that sends one message to the chat, e.g.
+        a partial of `bot.send_photo`, and waits for its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(chat_id, deque()).append(
+            OutboundMessage(send=send, future=future)
+        )
+        if chat_id not in self._senders:
+            self._senders[chat_id] = asyncio.create_task(
+                self._drain(chat_id)
+            )
+        return await future
+
+    async def send(
+        self, bot: Bot, chat_id: int, text: str, **kwargs: Any
+    ) -> Message:
+        """Queues a message for the chat and waits until it is sent."""
+        return await self.call(
+            chat_id, partial(bot.send_message, chat_id, text, **kwargs)
+        )
+
+    async def send_document(
+        self, bot: Bot, chat_id: int, document: Any, **kwargs: Any
+    ) -> Message:
+        """Queues a file for the chat and waits until it is sent."""
+        return await self.call(
+            chat_id, partial(bot.send_document, chat_id, document, **kwargs)
+        )
+
+    async def send_joined(
+        self, bot: Bot, chat_id: int, parts: List[str], **kwargs: Any
+    ) -> None:
+        """Sends parts, e.g. one per CV, joined into few messages."""
+        for text in join_messages(parts):
+            await self.send(bot, chat_id, text, **kwargs)
+
+    async def _drain(self, chat_id: int) -> None:
+        queue = self._queues[chat_id]
+        try:
+            while queue:
+                message = queue.popleft()
+                try:
+                    result = await self._deliver(chat_id, message)
+                except Exception as e:
+                    if not message.future.done():
+                        message.future.set_exception(e)
+                else:
+                    if not message.future.done():
+                        message.future.set_result(result)
+        finally:
+            for message in queue:
+                message.future.cancel()
+            del self._queues[chat_id]
+            del self._senders[chat_id]
+
+    async def _deliver(self, chat_id: int, message: OutboundMessage) -> Any:
+        bucket = self._chat_bucket(chat_id)
+        attempt = 0
+        while True:
+            delay = bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # A global token is only taken once the chat may send, so
+            # chats that wait long do not hold tokens and then burst
+            delay = self._global.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                return await message.send()
+            except TelegramRetryAfter as e:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                TELEGRAM_FLOOD_WAITS.inc()
+                bucket.block_for(e.retry_after)
+
+
+# Shared by the handlers, so the global limit holds across them
+outbound = OutboundScheduler()
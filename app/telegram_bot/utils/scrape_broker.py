@@ -0,0 +1,29 @@
+from typing import Optional
+
+from app.workers.broker import Broker, broker_from_env
+
+# Created by start_scrape_broker in the bot's main(), not on import,
+# so worker processes that re-import the bot's modules start none
+_scrape_broker: Optional[Broker] = None
+
+
+async def start_scrape_broker() -> None:
+    """Creates and starts the broker chosen by SCRAPE_BROKER."""
+    global _scrape_broker
+    if _scrape_broker is None:
+        _scrape_broker = broker_from_env()
+        if _scrape_broker is not None:
+            await _scrape_broker.start()
+
+
+async def close_scrape_broker() -> None:
+    global _scrape_broker
+    if _scrape_broker is not None:
+        await _scrape_broker.close()
+        _scrape_broker = None
+
+
+def scrape_broker() -> Optional[Broker]:
+    """The broker that sends scrapes to worker processes, or None
+    to scrape in the bot process."""
+    return _scrape_broker
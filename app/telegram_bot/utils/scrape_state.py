@@ -0,0 +1,61 @@
+from concurrent.futures import Executor
+from functools import lru_cache
+from typing import Awaitable, Callable, Tuple
+
+from app.parsers.cv_store import CVStore
+from app.parsers.html_parsing import create_parse_executor
+from app.parsers.http_cache import HttpCache
+from app.parsers.http_engine import HttpEngine
+from app.parsers.result_cache import ResultCache
+from app.parsers.site_configs.work_ua import WORK_UA_CACHE_POLICIES
+from app.telegram_bot.utils.job_queue import Job, scrape_jobs
+
+# Job queue lane of background refreshes: they take turns with users'
+# scrapes and, like them, count against the SCRAPE_WORKERS cap
+REFRESH_USER_ID = 0
+
+# State shared by the handlers' scrapes. Each piece is created on first
+# use, not on import: a bot that hands its scrapes to a broker never
+# builds the scraper state, and worker processes that re-import the
+# bot's modules build none of it.
+
+
+@lru_cache(maxsize=None)
+def shared_http_engine() -> HttpEngine:
+    """One connection pool for all in-process queries, so TLS sessions
+    are reused and the in-flight request cap holds for the process."""
+    return HttpEngine()
+
+
+@lru_cache(maxsize=None)
+def shared_parse_executor() -> Executor:
+    """Worker processes for HTML parsing, which is CPU-bound and is
+    kept off the bot's event loop."""
+    return create_parse_executor()
+
+
+@lru_cache(maxsize=None)
+def shared_work_ua_http_cache() -> HttpCache:
+    """Pages downloaded for earlier queries, reused or revalidated."""
+    return HttpCache(policies=WORK_UA_CACHE_POLICIES)
+
+
+@lru_cache(maxsize=None)
+def shared_cv_store() -> CVStore:
+    """Known, still fresh CVs skip both the fetch and the parse."""
+    return CVStore()
+
+
+def schedule_refresh(
+    key: Tuple[str, ...], refresh: Callable[[], Awaitable[None]]
+) -> bool:
+    """Queues the refresh of a stale answer as a scrape job."""
+    job = Job(user_id=REFRESH_USER_ID, key=key, run=refresh, site=key[0])
+    return scrape_jobs.submit(job) is not None
+
+
+@lru_cache(maxsize=None)
+def shared_result_cache() -> ResultCache:
+    """Answers to recent queries of both sites, refreshed in the
+    background once stale. Kept in the bot in every scrape mode."""
+    return ResultCache(schedule_refresh=schedule_refresh)
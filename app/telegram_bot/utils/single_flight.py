@@ -0,0 +1,60 @@
+import asyncio
+import re
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from app.parsers.city_index import normalize_city_name
+from app.parsers.metrics import COALESCED_QUERIES
+
+T = TypeVar("T")
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def query_key(
+    site: str, position: str, city: str, experience: str
+) -> Tuple[str, str, str, str]:
+    """The key under which equal bot queries are coalesced: case and
+    extra spaces do not matter, cities compare like in the city index."""
+    return (
+        site,
+        WHITESPACE_PATTERN.sub(" ", position.casefold()).strip(),
+        normalize_city_name(city),
+        experience.strip(),
+    )
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        """Runs at most one call per key at a time. Callers asking for
+        a key that is already in flight await that call and share its
+        result or exception instead of starting their own."""
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def run(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[T]],
+        site: str = "",
+    ) -> T:
+        """Awaits `func()` or the call in flight for `key`. A caller
+        that is cancelled leaves the call running for the others."""
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(func())
+            self._calls[key] = call
+
+            def forget(_: asyncio.Task) -> None:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+            call.add_done_callback(forget)
+        else:
+            COALESCED_QUERIES.inc(site=site)
+        return await asyncio.shield(call)
+
+
+# Shared by the work.ua and rabota.ua handlers; keys include the site
+scrape_flights = SingleFlight()
@@ -0,0 +1,287 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from app.parsers import json_codec
+from app.parsers.parse_utils import CV
+
+# "" scrapes in the bot process, "local" in worker processes started
+# by the bot, "redis" in workers anywhere that share a Redis server
+SCRAPE_BROKER = os.getenv("SCRAPE_BROKER", "")
+DEFAULT_REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+DEFAULT_SCRAPE_PROCESSES = int(
+    os.getenv("SCRAPE_PROCESSES", str(os.cpu_count() or 1))
+)
+# Seconds the bot waits for a worker to answer a scrape request
+DEFAULT_REQUEST_TIMEOUT = 300.0
+# Seconds an unread reply is kept in Redis
+REDIS_REPLY_TTL = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeError(Exception):
+    """A worker could not answer a scrape request."""
+
+
+@dataclass
+class ScrapeRequest:
+    # "work_ua" or "rabota_ua"
+    site: str
+    position: str
+    city: str
+    experience: str
+    request_id: str = ""
+    # Reply channel of the bot process that sent the request
+    reply_to: str = ""
+
+
+def encode_reply(
+    request: ScrapeRequest, cvs: List[CV], error: Optional[str] = None
+) -> bytes:
+    return json_codec.dumps(
+        {
+            "request_id": request.request_id,
+            "cvs": [asdict(cv) for cv in cvs],
+            "error": error,
+        }
+    )
+
+
+class Broker(ABC):
+    def __init__(self, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> None:
+        """Carries scrape requests from bot processes to workers and
+        their CVs back, as JSON. Subclasses move the raw messages; the
+        bot side matches replies to requests by id, so one reply
+        reader serves every request of the process."""
+        self.timeout = timeout
+        self.reply_to = uuid.uuid4().hex
+        self._waiting: Dict[str, asyncio.Future] = {}
+        self._reader: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def _put_request(self, data: bytes) -> None:
+        """Sends a request to the workers."""
+
+    @abstractmethod
+    async def _get_request(self) -> bytes:
+        """Waits for the next request; called by workers."""
+
+    @abstractmethod
+    async def _put_reply(self, reply_to: str, data: bytes) -> None:
+        """Sends a reply to the bot process `reply_to`."""
+
+    @abstractmethod
+    async def _get_reply(self) -> bytes:
+        """Waits for the next reply to this process."""
+
+    async def start(self) -> None:
+        """Starts reading replies; call it in the bot process."""
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read_replies())
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
+
+    def _dispatch(self, data: bytes) -> None:
+        """Hands a reply to the request waiting for it, if any."""
+        try:
+            reply = json_codec.loads(data)
+            waiter = self._waiting.pop(reply["request_id"], None)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Dropped a malformed scrape reply: %s", e)
+            return
+        if waiter is None or waiter.done():
+            return
+        if reply.get("error"):
+            waiter.set_exception(ScrapeError(reply["error"]))
+        else:
+            waiter.set_result([CV(**cv) for cv in reply["cvs"]])
+
+    async def _read_replies(self) -> None:
+        while True:
+            self._dispatch(await self._get_reply())
+
+    async def request(
+        self, site: str, position: str, city: str, experience: str
+    ) -> List[CV]:
+        """Has a worker scrape the top CVs and waits for them.
+        Raises ScrapeError if the worker failed and TimeoutError if
+        no answer came within `timeout` seconds."""
+        request = ScrapeRequest(
+            site=site,
+            position=position,
+            city=city,
+            experience=experience,
+            request_id=uuid.uuid4().hex,
+            reply_to=self.reply_to,
+        )
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting[request.request_id] = waiter
+        try:
+            await self._put_request(json_codec.dumps(asdict(request)))
+            return await asyncio.wait_for(waiter, self.timeout)
+        finally:
+            self._waiting.pop(request.request_id, None)
+
+    async def next_request(self) -> ScrapeRequest:
+        """Waits for the next scrape request; called by workers."""
+        return ScrapeRequest(**json_codec.loads(await self._get_request()))
+
+    async def reply(
+        self,
+        request: ScrapeRequest,
+        cvs: List[CV],
+        error: Optional[str] = None,
+    ) -> None:
+        """Sends a worker's answer back to the requesting bot."""
+        await self._put_reply(
+            request.reply_to, encode_reply(request, cvs, error)
+        )
+
+
+class LocalBroker(Broker):
+    def __init__(
+        self,
+        processes: int = DEFAULT_SCRAPE_PROCESSES,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        queues: Any = None,
+    ) -> None:
+        """Broker over multiprocessing queues. In the bot process,
+        `start` also spawns `processes` workers on this machine;
+        workers rebuild the broker from `queues`."""
+        super().__init__(timeout)
+        self.processes = processes
+        if queues is None:
+            context = multiprocessing.get_context("spawn")
+            queues = (context.Queue(), context.Queue())
+        self.queues = queues
+        self._requests, self._replies = queues
+        self._workers: List[multiprocessing.Process] = []
+        self._reader_thread: Optional[threading.Thread] = None
+
+    async def _put_request(self, data: bytes) -> None:
+        self._requests.put(data)
+
+    async def _get_request(self) -> bytes:
+        return await asyncio.to_thread(self._requests.get)
+
+    async def _put_reply(self, reply_to: str, data: bytes) -> None:
+        self._replies.put(data)
+
+    async def _get_reply(self) -> bytes:
+        return await asyncio.to_thread(self._replies.get)
+
+    async def start(self) -> None:
+        from app.workers.worker import run_local_worker
+
+        context = multiprocessing.get_context("spawn")
+        while len(self._workers) < self.processes:
+            # The index gives each worker an HTTP cache of its own
+            process = context.Process(
+                target=run_local_worker,
+                args=(self.queues, len(self._workers)),
+                daemon=True,
+            )
+            process.start()
+            self._workers.append(process)
+        if self._reader_thread is None:
+            # A blocking get cannot be cancelled, so replies are read
+            # by a daemon thread rather than an executor task
+            loop = asyncio.get_running_loop()
+
+            def read_replies() -> None:
+                while True:
+                    data = self._replies.get()
+                    try:
+                        loop.call_soon_threadsafe(self._dispatch, data)
+                    except RuntimeError:
+                        return  # The bot's event loop is closed
+
+            self._reader_thread = threading.Thread(
+                target=read_replies, daemon=True
+            )
+            self._reader_thread.start()
+
+    async def close(self) -> None:
+        """Stops the workers; requests they did not take are dropped."""
+        for process in self._workers:
+            process.terminate()
+        self._workers = []
+        self._requests.cancel_join_thread()
+
+
+class RedisBroker(Broker):
+    def __init__(
+        self,
+        client: Any = None,
+        url: str = DEFAULT_REDIS_URL,
+        prefix: str = "scrape",
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    ) -> None:
+        """Broker over Redis lists, for workers on other machines.
+        Requests go to one shared list; replies to a list per bot
+        process. `client` is a redis.asyncio client or anything with
+        the same `lpush`, `brpop`, `expire` and `aclose` methods;
+        by default one is connected to `url`."""
+        super().__init__(timeout)
+        if client is None:
+            try:
+                import redis.asyncio
+            except ImportError as e:
+                raise ImportError(
+                    "RedisBroker requires the redis package."
+                ) from e
+            client = redis.asyncio.Redis.from_url(url)
+        self.client = client
+        self.requests_key = f"{prefix}:requests"
+        self.prefix = prefix
+
+    def _replies_key(self, reply_to: str) -> str:
+        return f"{self.prefix}:replies:{reply_to}"
+
+    async def _put_request(self, data: bytes) -> None:
+        await self.client.lpush(self.requests_key, data)
+
+    async def _get_request(self) -> bytes:
+        _, data = await self.client.brpop(self.requests_key, timeout=0)
+        return data
+
+    async def _put_reply(self, reply_to: str, data: bytes) -> None:
+        key = self._replies_key(reply_to)
+        await self.client.lpush(key, data)
+        await self.client.expire(key, REDIS_REPLY_TTL)
+
+    async def _get_reply(self) -> bytes:
+        _, data = await self.client.brpop(
+            self._replies_key(self.reply_to), timeout=0
+        )
+        return data
+
+    async def close(self) -> None:
+        await super().close()
+        await self.client.aclose()
+
+
+def broker_from_env() -> Optional[Broker]:
+    """The broker chosen by SCRAPE_BROKER, or None to scrape in the
+    bot process."""
+    if not SCRAPE_BROKER:
+        return None
+    if SCRAPE_BROKER == "local":
+        return LocalBroker()
+    if SCRAPE_BROKER == "redis":
+        return RedisBroker()
+    raise ValueError(
+        f"Unknown SCRAPE_BROKER {SCRAPE_BROKER!r}, "
+        "expected 'local' or 'redis'."
+    )
@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import logging
+import os
+from typing import List, Optional
+
+from app.parsers.cv_store import CVStore
+from app.parsers.http_cache import DEFAULT_HTTP_CACHE_DIR, HttpCache
+from app.parsers.http_engine import HttpEngine
+from app.parsers.main import get_rabota_ua_top_5_cvs, get_work_ua_top_5_cvs
+from app.parsers.parse_utils import CV
+from app.parsers.site_configs.work_ua import WORK_UA_CACHE_POLICIES
+from app.workers.broker import (
+    DEFAULT_REDIS_URL,
+    Broker,
+    LocalBroker,
+    RedisBroker,
+    ScrapeRequest,
+)
+
+# Requests one worker process scrapes at the same time
+DEFAULT_WORKER_CONCURRENCY = 4
+# HTTP cache of a Redis worker, apart from the bot's and local workers'
+DEFAULT_REDIS_WORKER_CACHE_DIR = os.path.join(
+    DEFAULT_HTTP_CACHE_DIR, "redis-worker"
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeWorker:
+    def __init__(
+        self,
+        broker: Broker,
+        http_cache_dir: str,
+        cv_store: Optional[CVStore] = None,
+    ) -> None:
+        """Answers scrape requests from `broker` with the same scrapers
+        the bot uses in-process. HTML is parsed on the worker's own
+        event loop: the worker process is the unit of parallelism.
+        HttpCache keeps its index and size in memory, so each worker
+        process needs an `http_cache_dir` of its own; the SQLite CV
+        store is safe to share and defaults to the bot's."""
+        self.broker = broker
+        self.http_engine = HttpEngine()
+        self.http_cache = HttpCache(
+            directory=http_cache_dir, policies=WORK_UA_CACHE_POLICIES
+        )
+        self.cv_store = cv_store or CVStore()
+
+    async def scrape(self, request: ScrapeRequest) -> List[CV]:
+        if request.site == "work_ua":
+            return await get_work_ua_top_5_cvs(
+                position=request.position,
+                location=request.city,
+                experience=request.experience,
+                http_engine=self.http_engine,
+                http_cache=self.http_cache,
+                cv_store=self.cv_store,
+            )
+        if request.site == "rabota_ua":
+            return await get_rabota_ua_top_5_cvs(
+                request.position,
+                request.city,
+                request.experience,
+                http_engine=self.http_engine,
+            )
+        raise ValueError(f"Unknown site {request.site!r}")
+
+    async def _serve(self) -> None:
+        while True:
+            request = await self.broker.next_request()
+            try:
+                cvs = await self.scrape(request)
+            except Exception as e:
+                logger.exception("Scrape request %s failed", request)
+                await self.broker.reply(request, [], error=str(e) or repr(e))
+            else:
+                await self.broker.reply(request, cvs)
+
+    async def run(
+        self, concurrency: int = DEFAULT_WORKER_CONCURRENCY
+    ) -> None:
+        """Serves requests, `concurrency` at a time, until cancelled."""
+        try:
+            await asyncio.gather(
+                *(self._serve() for _ in range(concurrency))
+            )
+        finally:
+            await self.http_engine.close()
+
+
+def local_worker_cache_dir(index: int) -> str:
+    """HTTP cache directory of the `index`-th local worker process."""
+    return os.path.join(DEFAULT_HTTP_CACHE_DIR, f"worker-{index}")
+
+
+def run_local_worker(queues, index: int = 0) -> None:
+    """Entry point of the worker processes LocalBroker spawns."""
+    logging.basicConfig(level=logging.INFO)
+    worker = ScrapeWorker(
+        LocalBroker(queues=queues),
+        http_cache_dir=local_worker_cache_dir(index),
+    )
+    asyncio.run(worker.run())
+
+
+async def run_redis_worker(
+    url: str,
+    concurrency: int,
+    http_cache_dir: str = DEFAULT_REDIS_WORKER_CACHE_DIR,
+) -> None:
+    broker = RedisBroker(url=url)
+    try:
+        await ScrapeWorker(broker, http_cache_dir).run(concurrency)
+    finally:
+        await broker.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Scrape worker serving bot requests through Redis."
+    )
+    parser.add_argument("--redis-url", default=DEFAULT_REDIS_URL)
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_WORKER_CONCURRENCY
+    )
+    parser.add_argument(
+        "--http-cache-dir",
+        default=DEFAULT_REDIS_WORKER_CACHE_DIR,
+        help="HTTP cache of this worker; give every worker on a machine "
+        "its own.",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(
+        run_redis_worker(
+            args.redis_url, args.concurrency, args.http_cache_dir
+        )
+    )
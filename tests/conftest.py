@@ -0,0 +1,41 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+from aiohttp import web
+
+from app.benchmarks.stand_in_server import StandIn, StandInConfig
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def stand_in_url():
+    """Base URL of a work.ua / rabota.ua stand-in without added latency,
+    served from a background thread for the whole test session."""
+    config = StandInConfig(min_latency=0.0, max_latency=0.0)
+    port = free_port()
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    runner = web.AppRunner(StandIn(config).make_app(), access_log=None)
+
+    async def start() -> None:
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        started.set()
+
+    thread = threading.Thread(
+        target=lambda: (loop.run_until_complete(start()), loop.run_forever()),
+        daemon=True,
+    )
+    thread.start()
+    started.wait(10)
+    yield f"http://127.0.0.1:{port}"
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
@@ -0,0 +1,21 @@
+import dataclasses
+
+from app.parsers.site_configs.work_ua import (
+    WORK_UA_BASE_URL,
+    WORK_UA_CONFIG,
+    work_ua_url_generator,
+)
+
+
+def work_ua_stand_in(base_url: str, **config_changes):
+    """work.ua site config and URL generator pointed at the stand-in."""
+    config = dataclasses.replace(
+        WORK_UA_CONFIG, base_url=base_url, **config_changes
+    )
+
+    def url_generator(**kwargs) -> str:
+        return work_ua_url_generator(**kwargs).replace(
+            WORK_UA_BASE_URL, base_url
+        )
+
+    return config, url_generator
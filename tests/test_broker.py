@@ -0,0 +1,86 @@
+import asyncio
+from collections import defaultdict, deque
+
+import pytest
+
+from app.parsers.cv_store import CVStore
+from app.parsers.parse_utils import CV
+from app.workers.broker import RedisBroker, ScrapeError
+from app.workers.worker import ScrapeWorker
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio lists RedisBroker uses."""
+
+    def __init__(self):
+        self.lists = defaultdict(deque)
+        self.expiring = set()
+        self.changed = asyncio.Condition()
+
+    async def lpush(self, key, data):
+        async with self.changed:
+            self.lists[key].appendleft(data)
+            self.changed.notify_all()
+
+    async def brpop(self, key, timeout=0):
+        async with self.changed:
+            await self.changed.wait_for(lambda: self.lists[key])
+            return key, self.lists[key].pop()
+
+    async def expire(self, key, seconds):
+        self.expiring.add(key)
+
+    async def aclose(self):
+        pass
+
+
+class FakeScrapeWorker(ScrapeWorker):
+    async def scrape(self, request):
+        if request.position == "broken":
+            raise RuntimeError("site is down")
+        return [
+            CV(
+                name=f"{request.position} developer",
+                age=30,
+                skills=["Python"],
+                location=request.city,
+                education=True,
+                additional_education_exists=False,
+                url="https://example.com/resumes/1/",
+            )
+        ]
+
+
+def test_redis_broker_round_trip(tmp_path):
+    async def main():
+        client = FakeRedis()
+        bot_broker = RedisBroker(client=client, timeout=5)
+        worker = FakeScrapeWorker(
+            RedisBroker(client=client),
+            http_cache_dir=str(tmp_path / "http"),
+            cv_store=CVStore(str(tmp_path / "cvs.sqlite3")),
+        )
+        serving = asyncio.create_task(worker.run(concurrency=2))
+        await bot_broker.start()
+        try:
+            cvs = await bot_broker.request(
+                "work_ua", "python", "Київ", "Без досвіду"
+            )
+            with pytest.raises(ScrapeError, match="site is down"):
+                await bot_broker.request(
+                    "work_ua", "broken", "Київ", "Без досвіду"
+                )
+        finally:
+            serving.cancel()
+            await asyncio.gather(serving, return_exceptions=True)
+            await bot_broker.close()
+            worker.cv_store.close()
+        return client, bot_broker, cvs
+
+    client, bot_broker, cvs = asyncio.run(main())
+    assert [(cv.name, cv.location) for cv in cvs] == [
+        ("python developer", "Київ")
+    ]
+    # Replies go to the list of the requesting bot process and expire
+    assert client.expiring == {bot_broker._replies_key(bot_broker.reply_to)}
+    assert not client.lists[bot_broker.requests_key]
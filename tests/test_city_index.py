@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+
+from app.parsers.city_index import CityIndex
+
+CITIES = [
+    {"id": 1, "nameUkr": "Київ", "name": "Киев", "en": "Kyiv"},
+    {"id": 2, "nameUkr": "Львів", "name": "Львов", "en": "Lviv"},
+]
+
+
+def test_concurrent_cold_lookups_download_once(tmp_path):
+    city_index = CityIndex(str(tmp_path / "cities.json"))
+    downloads = 0
+
+    async def loader():
+        nonlocal downloads
+        downloads += 1
+        await asyncio.sleep(0.01)
+        return CITIES
+
+    async def main():
+        return await asyncio.gather(
+            *(city_index.lookup_async("Kyiv", loader) for _ in range(5))
+        )
+
+    assert asyncio.run(main()) == [1] * 5
+    assert downloads == 1
+
+
+def test_concurrent_cold_sync_lookups_download_once(tmp_path):
+    city_index = CityIndex(str(tmp_path / "cities.json"))
+    downloads = 0
+    results = []
+
+    def loader():
+        nonlocal downloads
+        downloads += 1
+        time.sleep(0.05)
+        return CITIES
+
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(city_index.lookup("Львов", loader))
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [2] * 5
+    assert downloads == 1
+
+
+def test_cancelled_refresh_does_not_block_later_ones(tmp_path):
+    city_index = CityIndex(str(tmp_path / "cities.json"), ttl=0)
+    city_index.update(CITIES)
+
+    async def hanging_loader():
+        await asyncio.Event().wait()
+
+    async def cancelled_refresh():
+        # Starts a refresh on a loop that then shuts down
+        await city_index.lookup_async("Kyiv", hanging_loader)
+
+    asyncio.run(cancelled_refresh())
+    assert city_index._refresh_task.cancelled()
+
+    async def refresh_again():
+        assert await city_index.lookup_async("Kyiv", hanging_loader) == 1
+        task = city_index._refresh_task
+        task.cancel()
+        return task
+
+    first_task = city_index._refresh_task
+    assert asyncio.run(refresh_again()) is not first_task
@@ -0,0 +1,45 @@
+import copy
+import random
+
+import pytest
+
+from app.parsers.cv_batch import CVBatch
+from app.parsers.parse_utils import CV
+from app.parsers.top_k import TopKSelector
+
+# CVBatch imports numpy when a batch is built
+pytest.importorskip("numpy")
+
+
+def random_cv(rng: random.Random, number: int) -> CV:
+    return CV(
+        name=f"Candidate {number}",
+        age=rng.choice([None, 0, rng.randint(16, 70)]),
+        skills=["skill"] * rng.randint(0, 12),
+        location="Київ",
+        education=rng.random() < 0.5,
+        additional_education_exists=rng.random() < 0.5,
+        languages_exist=rng.choice([None, False, True]),
+        additional_info=rng.choice([None, False, True]),
+        salary=rng.choice([None, 0, 30000]),
+        url=f"https://www.work.ua/resumes/{number}/",
+        photo=rng.choice([None, "", "https://www.work.ua/photo.jpg"]),
+    )
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_batch_matches_calculate_rating(seed):
+    rng = random.Random(seed)
+    cvs = [random_cv(rng, number) for number in range(rng.randint(1, 300))]
+    expected = copy.deepcopy(cvs)
+    for cv in expected:
+        cv.calculate_rating()
+
+    assert CVBatch(cvs).ratings().tolist() == [cv.rating for cv in expected]
+
+    k = rng.randint(1, 10)
+    selector = TopKSelector(k)
+    selector.extend(expected)
+    assert [cv.url for cv in CVBatch(cvs).top_k(k)] == [
+        cv.url for cv in selector.results()
+    ]
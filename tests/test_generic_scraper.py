@@ -0,0 +1,64 @@
+import asyncio
+
+from app.parsers.cv_store import CVStore
+from app.parsers.generic_scraper import GenericScraper
+from app.parsers.html_parsing import PARSER_VERSION
+from app.parsers.site_configs.work_ua import WORK_UA_EXPERIENCE_CATEGORIES
+
+from tests.helpers import work_ua_stand_in
+
+
+class FailingScraper(GenericScraper):
+    async def extract_cv_data(self, url: str):
+        if url.rstrip("/").endswith("7"):
+            raise OSError("disk full")
+        return await super().extract_cv_data(url)
+
+
+def test_stream_survives_failing_detail_pages(stand_in_url):
+    config, url_generator = work_ua_stand_in(stand_in_url)
+
+    async def collect():
+        async with FailingScraper(
+            config=config,
+            experience_categories=WORK_UA_EXPERIENCE_CATEGORIES,
+            position="python",
+            location="Київ",
+            url_generator=url_generator,
+        ) as scraper:
+            return [cv async for cv in scraper.stream_cv_data(workers=2)]
+
+    cvs = asyncio.run(asyncio.wait_for(collect(), 30))
+    urls = [cv.url for cv in cvs]
+    # 10 pages x 14 cards, resumes ending in 7 fail
+    assert len(urls) == 140 - 14
+    assert not any(url.rstrip("/").endswith("7") for url in urls)
+
+
+class InterstitialScraper(GenericScraper):
+    async def get_page_html(self, url: str) -> str:
+        if url.rstrip("/").endswith("2"):
+            return "<html><body>Checking your browser...</body></html>"
+        return await super().get_page_html(url)
+
+
+def test_only_parsed_cvs_are_stored(stand_in_url, tmp_path):
+    config, url_generator = work_ua_stand_in(stand_in_url)
+    cv_store = CVStore(str(tmp_path / "cvs.sqlite3"))
+    urls = [f"{stand_in_url}/resumes/{number}/" for number in (1, 2)]
+
+    async def extract():
+        async with InterstitialScraper(
+            config=config,
+            experience_categories=WORK_UA_EXPERIENCE_CATEGORIES,
+            position="python",
+            url_generator=url_generator,
+            cv_store=cv_store,
+        ) as scraper:
+            return [await scraper.extract_cv_data(url) for url in urls]
+
+    resume, interstitial = asyncio.run(extract())
+    assert resume.name != "Unknown" and interstitial.name == "Unknown"
+    assert cv_store.get(urls[0], PARSER_VERSION) == resume
+    assert cv_store.get(urls[1], PARSER_VERSION) is None
+    cv_store.close()
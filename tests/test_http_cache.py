@@ -0,0 +1,55 @@
+import asyncio
+import errno
+
+from app.parsers.http_cache import HttpCache
+from app.parsers.http_engine import FetchResult
+
+URL = "https://www.work.ua/resumes/1/"
+
+
+class FakeEngine:
+    def __init__(self, status: int = 200, body: bytes = b"<html></html>"):
+        self.status = status
+        self.body = body
+
+    async def fetch(self, url: str, headers: dict = None) -> FetchResult:
+        return FetchResult(
+            url=url, status=self.status, headers={}, body=self.body
+        )
+
+
+def test_failed_write_still_returns_page(tmp_path, monkeypatch):
+    cache = HttpCache(directory=str(tmp_path))
+
+    def disk_full(path, data):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(cache, "_write", disk_full)
+    text = asyncio.run(cache.fetch_text(FakeEngine(), URL))
+    assert text == "<html></html>"
+    assert cache.get(URL) is None
+    assert cache.total_bytes == 0
+
+
+def test_failed_refresh_still_returns_page(tmp_path, monkeypatch):
+    cache = HttpCache(directory=str(tmp_path))
+    entry = cache.put(
+        FetchResult(url=URL, status=200, headers={}, body=b"stored")
+    )
+    entry.stored_at = 0
+
+    def disk_full(path, data):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(cache, "_write", disk_full)
+    text = asyncio.run(cache.fetch_text(FakeEngine(status=304), URL))
+    assert text == "stored"
+
+
+def test_writes_leave_no_temporary_files(tmp_path):
+    cache = HttpCache(directory=str(tmp_path))
+    for _ in range(3):
+        cache.put(FetchResult(url=URL, status=200, headers={}, body=b"x"))
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [
+        ".body", ".meta"
+    ]
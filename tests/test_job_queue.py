@@ -0,0 +1,59 @@
+import asyncio
+
+from app.telegram_bot.utils.job_queue import Job, JobQueue
+
+
+def test_failed_job_is_reported_and_worker_goes_on():
+    events = []
+
+    async def fail():
+        raise TimeoutError("no worker answered")
+
+    async def succeed():
+        events.append("second job ran")
+
+    async def on_error(error):
+        events.append(f"reported {error}")
+
+    async def main():
+        queue = JobQueue(workers=1)
+        queue.start()
+        queue.submit(Job(user_id=1, key="a", run=fail, on_error=on_error))
+        queue.submit(Job(user_id=1, key="b", run=succeed))
+        for _ in range(100):
+            if len(events) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(main())
+    assert events == ["reported no worker answered", "second job ran"]
+
+
+def test_failing_error_report_does_not_stop_the_worker():
+    events = []
+
+    async def fail():
+        raise RuntimeError("scrape failed")
+
+    async def broken_report(error):
+        raise RuntimeError("telegram is down")
+
+    async def succeed():
+        events.append("second job ran")
+
+    async def main():
+        queue = JobQueue(workers=1)
+        queue.start()
+        queue.submit(
+            Job(user_id=1, key="a", run=fail, on_error=broken_report)
+        )
+        queue.submit(Job(user_id=1, key="b", run=succeed))
+        for _ in range(100):
+            if events:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(main())
+    assert events == ["second job ran"]
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from html import escape
+
+from app.telegram_bot.utils.outbound import OutboundScheduler, join_messages
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.started_at = time.monotonic()
+
+    def _record(self, kind, chat_id, content):
+        self.sent.append(
+            (kind, chat_id, content, time.monotonic() - self.started_at)
+        )
+        return content
+
+    async def send_message(self, chat_id, text, **kwargs):
+        return self._record("message", chat_id, text)
+
+    async def send_document(self, chat_id, document, **kwargs):
+        return self._record("document", chat_id, document)
+
+
+def test_documents_go_through_the_scheduler():
+    async def main():
+        bot = FakeBot()
+        scheduler = OutboundScheduler()
+        await scheduler.send(bot, 1, "report follows")
+        await scheduler.send_document(bot, 1, "profile.txt")
+        return bot.sent
+
+    sent = asyncio.run(main())
+    assert [(kind, content) for kind, _, content, _ in sent] == [
+        ("message", "report follows"),
+        ("document", "profile.txt"),
+    ]
+
+
+def test_waiting_chat_does_not_hold_global_tokens():
+    async def main():
+        bot = FakeBot()
+        scheduler = OutboundScheduler(
+            global_rate=2.0, chat_rate=1.0, chat_burst=1
+        )
+        # The second message of chat 1 waits about a second for its chat
+        busy_chat = asyncio.gather(
+            scheduler.send(bot, 1, "first"), scheduler.send(bot, 1, "second")
+        )
+        await asyncio.sleep(0.05)
+        await scheduler.send(bot, 2, "other chat")
+        await busy_chat
+        return {content: at for _, _, content, at in bot.sent}
+
+    sent_at = asyncio.run(main())
+    assert sent_at["other chat"] < 0.3
+    assert sent_at["second"] >= 0.9
+
+
+def test_long_parts_are_never_cut_inside_an_entity():
+    part = escape("R&D <python> " * 20).replace(" ", "")
+    pieces = join_messages([part], limit=25)
+    assert "".join(pieces) == part
+    for piece in pieces:
+        assert len(piece) <= 25
+        assert piece.count("&") == piece.count(";")
+
+
+def test_long_parts_are_cut_at_line_breaks():
+    lines = [f"line {number}" for number in range(10)]
+    pieces = join_messages(["\n".join(lines)], limit=30)
+    assert all(len(piece) <= 30 for piece in pieces)
+    assert "\n".join(pieces).splitlines() == lines
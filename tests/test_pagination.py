@@ -0,0 +1,47 @@
+from app.parsers.pagination import PaginationBudget, PaginationPlanner
+
+
+def crawl(planner, total_pages, cards_per_page=14, latency=lambda page: 0.1):
+    """Pages the planner asks for, batch by batch; `latency` gives
+    how long each page takes."""
+    planner.start(total_pages)
+    planner.record(latency(1), cards_per_page)
+    batches = []
+    while batch := planner.next_batch():
+        batches.append(batch)
+        for page in batch:
+            planner.record(latency(page), cards_per_page)
+    return batches
+
+
+def test_fetches_every_page_once_without_a_budget():
+    batches = crawl(PaginationPlanner(), total_pages=30)
+    pages = [page for batch in batches for page in batch]
+    assert pages == list(range(2, 31))
+
+
+def test_batches_grow_while_pages_are_fast():
+    batches = crawl(PaginationPlanner(max_concurrency=4), total_pages=30)
+    assert [len(batch) for batch in batches[:4]] == [2, 3, 4, 4]
+
+
+def test_batches_shrink_when_pages_are_slow():
+    planner = PaginationPlanner(target_latency=1.0)
+    batches = crawl(
+        planner, total_pages=30, latency=lambda page: 5.0 if page > 9 else 0.1
+    )
+    # Pages 2-9 are fast, then every page is slow
+    assert [len(batch) for batch in batches[:6]] == [2, 3, 4, 2, 1, 1]
+
+
+def test_max_pages_caps_the_crawl():
+    planner = PaginationPlanner(PaginationBudget(max_pages=5))
+    batches = crawl(planner, total_pages=30)
+    assert batches[-1][-1] == 5
+
+
+def test_max_candidates_stops_the_crawl():
+    planner = PaginationPlanner(PaginationBudget(max_candidates=100))
+    batches = crawl(planner, total_pages=30, cards_per_page=20)
+    pages = [page for batch in batches for page in batch]
+    assert pages == [2, 3, 4, 5]
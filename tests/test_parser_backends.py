@@ -0,0 +1,48 @@
+import dataclasses
+
+import pytest
+
+from app.benchmarks.stand_in_server import StandIn, StandInConfig
+from app.parsers.html_parsing import parse_cv_fields, parse_listing_page
+from app.parsers.parser_backends import (
+    DEFAULT_PARSER_BACKEND,
+    PARSER_BACKENDS,
+    get_parser_backend,
+)
+from app.parsers.site_configs.work_ua import WORK_UA_CONFIG
+
+OTHER_BACKENDS = [
+    name for name in PARSER_BACKENDS if name != DEFAULT_PARSER_BACKEND
+]
+
+
+@pytest.fixture(scope="module")
+def stand_in():
+    return StandIn(StandInConfig())
+
+
+def backend_config(name: str):
+    try:
+        get_parser_backend(name)
+    except ImportError as e:
+        pytest.skip(str(e))
+    return dataclasses.replace(WORK_UA_CONFIG, parser_backend=name)
+
+
+@pytest.mark.parametrize("backend", OTHER_BACKENDS)
+def test_listing_page_matches_default_backend(stand_in, backend):
+    config = backend_config(backend)
+    for page in (1, 5, 10):
+        html = stand_in.render_listing(page, "python")
+        expected = parse_listing_page(html, WORK_UA_CONFIG)
+        assert expected["urls"]
+        assert parse_listing_page(html, config) == expected
+
+
+@pytest.mark.parametrize("backend", OTHER_BACKENDS)
+def test_cv_fields_match_default_backend(stand_in, backend):
+    config = backend_config(backend)
+    for resume_id in range(1, 41):
+        html = stand_in.render_resume(resume_id)
+        expected = parse_cv_fields(html, WORK_UA_CONFIG)
+        assert parse_cv_fields(html, config) == expected
@@ -0,0 +1,61 @@
+import asyncio
+
+from app.parsers.profiling import RunProfiler
+
+
+async def profiled_search() -> int:
+    total = 0
+    for _ in range(3):
+        total += await asyncio.create_task(asyncio.sleep(0.01, 1))
+    return total
+
+
+async def unrelated_busy_work(until: float) -> None:
+    loop = asyncio.get_running_loop()
+    while loop.time() < until:
+        sum(range(1000))
+        await asyncio.sleep(0)
+
+
+def test_profile_holds_only_the_run(tmp_path):
+    async def main():
+        loop = asyncio.get_running_loop()
+        busy = asyncio.create_task(unrelated_busy_work(loop.time() + 0.3))
+        profilers = [
+            RunProfiler(f"run{number}", directory=str(tmp_path))
+            for number in range(2)
+        ]
+        # Overlapping profiled runs each get a report
+        results = await asyncio.gather(
+            *(profiler.run(profiled_search) for profiler in profilers)
+        )
+        await busy
+        return profilers, results
+
+    profilers, results = asyncio.run(main())
+    assert results == [3, 3]
+    for profiler in profilers:
+        with open(profiler.report_path, encoding="utf-8") as report_file:
+            report = report_file.read()
+        assert "profiled_search" in report
+        assert "unrelated_busy_work" not in report
+
+
+def test_cpu_time_is_only_the_runs(tmp_path):
+    async def idle_search() -> None:
+        await asyncio.sleep(0.3)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        busy = asyncio.create_task(unrelated_busy_work(loop.time() + 0.3))
+        profiler = RunProfiler("idle", directory=str(tmp_path))
+        await profiler.run(idle_search)
+        await busy
+        return profiler
+
+    profiler = asyncio.run(main())
+    with open(profiler.report_path, encoding="utf-8") as report_file:
+        times = report_file.read().splitlines()[1]
+    # The bot's busy loop must not count as the run's CPU time
+    cpu_time = float(times.split("CPU time: ")[1].split()[0])
+    assert cpu_time < 0.1
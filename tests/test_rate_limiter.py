@@ -0,0 +1,95 @@
+import asyncio
+from dataclasses import dataclass, field
+
+import pytest
+
+from app.parsers.rate_limiter import (
+    AdaptiveRateLimiter,
+    RateLimitConfig,
+    RetryPolicy,
+    send_with_retries,
+    send_with_retries_sync,
+)
+
+URL = "https://api.example.com/resumes"
+NO_DELAY = RetryPolicy(max_retries=2, base_delay=0.0)
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict = field(default_factory=dict)
+
+
+class Server:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Response(outcome)
+
+
+def limiter():
+    return AdaptiveRateLimiter(RateLimitConfig(initial_rate=40, burst=100))
+
+
+def send_sync(server, rate_limiter=None):
+    return send_with_retries_sync(
+        server,
+        URL,
+        rate_limiter or limiter(),
+        NO_DELAY,
+        (ConnectionError,),
+        lambda response: response.status,
+    )
+
+
+def send_async(server, rate_limiter=None):
+    async def send():
+        return server()
+
+    return asyncio.run(
+        send_with_retries(
+            send,
+            URL,
+            rate_limiter or limiter(),
+            NO_DELAY,
+            (ConnectionError,),
+            lambda response: response.status,
+        )
+    )
+
+
+@pytest.mark.parametrize("send", [send_sync, send_async])
+def test_retries_errors_until_success(send):
+    server = Server(ConnectionError(), 503, 200)
+    assert send(server).status == 200
+    assert server.calls == 3
+
+
+@pytest.mark.parametrize("send", [send_sync, send_async])
+def test_returns_the_last_error_status(send):
+    server = Server(503, 429, 503)
+    assert send(server).status == 503
+    assert server.calls == 3
+
+
+@pytest.mark.parametrize("send", [send_sync, send_async])
+def test_raises_the_last_network_error(send):
+    server = Server(ConnectionError(), ConnectionError(), ConnectionError())
+    with pytest.raises(ConnectionError):
+        send(server)
+    assert server.calls == 3
+
+
+@pytest.mark.parametrize("send", [send_sync, send_async])
+def test_clients_adapt_the_rate_alike(send):
+    rate_limiter = limiter()
+    send(Server(503, 200), rate_limiter)
+    # Halved after the 503, then one additive step after the 200
+    assert rate_limiter.rate(URL) == 40 * 0.5 + 0.5
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import time
+
+from app.parsers.parse_utils import CV
+from app.parsers.result_cache import ResultCache
+from app.telegram_bot.utils.job_queue import Job, JobQueue
+
+
+def make_cv(url: str) -> CV:
+    return CV(
+        name="Name",
+        age=30,
+        skills=["Python"],
+        location="Київ",
+        education=True,
+        additional_education_exists=False,
+        url=url,
+    )
+
+
+def test_stale_refreshes_share_the_job_queue_cap():
+    queue = JobQueue(workers=1)
+    running = 0
+    most_running = 0
+
+    async def search():
+        nonlocal running, most_running
+        running += 1
+        most_running = max(most_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return [make_cv("https://example.com/resumes/2/")]
+
+    def schedule_refresh(key, refresh):
+        job = Job(user_id=0, key=key, run=refresh)
+        return queue.submit(job) is not None
+
+    async def main():
+        cache = ResultCache(
+            fresh_for=0,
+            directory=None,
+            schedule_refresh=schedule_refresh,
+        )
+        keys = [("work_ua", f"position {n}", "", "") for n in range(5)]
+        for key in keys:
+            cache.put(key, [make_cv("https://example.com/resumes/1/")])
+        for _ in range(3):
+            for key in keys:
+                await cache.fetch(key, search)
+        # One refresh per stale key, none started before the queue runs
+        assert len(queue) == len(keys)
+        assert running == 0
+        queue.start()
+        for _ in range(100):
+            if not len(queue) and not running:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return [cache.get(key).cvs[0].url for key in keys]
+
+    urls = asyncio.run(main())
+    assert most_running == 1
+    assert urls == ["https://example.com/resumes/2/"] * 5
+
+
+def test_writes_delete_expired_answers(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    expired = ("work_ua", "expired", "", "")
+    cache.put(expired, [make_cv("https://example.com/resumes/1/")])
+    long_ago = time.time() - cache.fresh_for - cache.stale_for - 1
+    os.utime(cache._path(expired), (long_ago, long_ago))
+
+    cache.put(("work_ua", "new", "", ""), [make_cv("https://e.com/2/")])
+    assert not os.path.exists(cache._path(expired))
+
+
+def test_writes_keep_at_most_max_entries_on_disk(tmp_path):
+    cache = ResultCache(max_entries=3, directory=str(tmp_path))
+    keys = [("work_ua", f"position {n}", "", "") for n in range(5)]
+    for n, key in enumerate(keys):
+        cache.put(key, [make_cv(f"https://example.com/resumes/{n}/")])
+        # Saved one after another, a second apart
+        modified_at = time.time() - 60 + n
+        os.utime(cache._path(key), (modified_at, modified_at))
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(cache._path(key)) for key in keys[-3:]
+    )
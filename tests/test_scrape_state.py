@@ -0,0 +1,21 @@
+from app.telegram_bot.handlers import rabota_ua_handler, work_ua_handler
+from app.telegram_bot.utils import city_suggestions, scrape_state
+from app.telegram_bot.utils.scrape_broker import scrape_broker
+
+SHARED_STATE = (
+    scrape_state.shared_http_engine,
+    scrape_state.shared_parse_executor,
+    scrape_state.shared_work_ua_http_cache,
+    scrape_state.shared_cv_store,
+    scrape_state.shared_result_cache,
+    city_suggestions.city_list_client,
+)
+
+
+def test_importing_handlers_builds_no_scraper_state():
+    # Spawned scrape workers re-import the bot's modules
+    assert work_ua_handler.SITE and rabota_ua_handler.SITE
+    assert all(
+        getter.cache_info().currsize == 0 for getter in SHARED_STATE
+    )
+    assert scrape_broker() is None